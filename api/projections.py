@@ -0,0 +1,83 @@
+"""Sparse, ``.values()``-based representations of the API resources.
+
+A ``Projection`` maps public field names to ORM lookups. The views ask
+the database only for the lookups behind the requested ``?fields=``. Rows
+come back as dicts and are renamed into the response without building
+model instances.
+"""
+from posts.models import Post
+
+
+class InvalidFields(Exception):
+    pass
+
+
+class Projection:
+
+    def __init__(self, fields, convert=None):
+        # Публичное имя поля -> путь для .values()
+        self.fields = dict(fields)
+        # Публичное имя поля -> функция, приводящая значение к JSON
+        self.convert = convert or {}
+
+    def parse(self, fields_param):
+        """Field names asked for by ``?fields=a,b``; all of them if empty."""
+        if not fields_param:
+            return list(self.fields)
+        names = [name.strip() for name in fields_param.split(',')
+                 if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise InvalidFields(unknown)
+        return names
+
+    def values(self, queryset, names, required=()):
+        """``queryset.values()`` with the lookups behind ``names`` plus
+        the ``required`` ones (e.g. the ordering of the cursor)."""
+        lookups = {self.fields[name] for name in names}
+        lookups.update(required)
+        return queryset.values(*lookups)
+
+    def serialize(self, rows, names):
+        """Turn ``.values()`` rows into dicts with the public ``names``."""
+        pairs = [(name, self.fields[name], self.convert.get(name))
+                 for name in names]
+        result = []
+        for row in rows:
+            item = {}
+            for name, lookup, convert in pairs:
+                value = row[lookup]
+                item[name] = (convert(value)
+                              if convert is not None and value is not None
+                              else value)
+            result.append(item)
+        return result
+
+
+def image_url(name):
+    return Post._meta.get_field('image').storage.url(name) if name else None
+
+
+POST = Projection(
+    {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated_at': 'updated_at',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'image_width': 'image_width',
+        'image_height': 'image_height',
+        'comment_count': 'comment_count',
+    },
+    convert={'image': image_url},
+)
+
+COMMENT = Projection({
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+})
@@ -0,0 +1,103 @@
+import json
+
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='api_author')
+        cls.reader = User.objects.create(username='api_reader')
+        cls.group = Group.objects.create(title='api', slug='api',
+                                         description='api')
+        cls.posts = [
+            Post.objects.create(text=f'post {i}', author=cls.author,
+                                group=cls.group if i % 2 else None)
+            for i in range(5)
+        ]
+        for i in range(3):
+            Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                                   text=f'comment {i}')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def get(self, url, client=None, **params):
+        response = (client or self.guest_client).get(url, params)
+        return response, json.loads(response.content)
+
+    def test_index_cursor_pages(self):
+        """Лента листается курсором, записи - от новых к старым."""
+        url = reverse('api:index')
+        with self.assertNumQueries(1):
+            response, data = self.get(url, limit=2)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual([post['text'] for post in data['results']],
+                         ['post 4', 'post 3'])
+        self.assertIsNone(data['previous'])
+
+        texts = []
+        url += '?limit=2'
+        while url:
+            data = json.loads(self.guest_client.get(url).content)
+            texts += [post['text'] for post in data['results']]
+            url = data['next']
+        self.assertEqual(texts, [f'post {i}' for i in range(4, -1, -1)])
+
+    def test_sparse_fields(self):
+        """?fields= отдаёт только запрошенные поля."""
+        response, data = self.get(reverse('api:index'),
+                                  fields='id,author,image')
+        self.assertEqual(data['results'][0],
+                         {'id': self.posts[4].id, 'author': 'api_author',
+                          'image': None})
+
+        response, data = self.get(reverse('api:index'), fields='id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(data['fields'], ['secret'])
+
+    def test_group_profile_and_follow(self):
+        """Лента сообщества, автора и подписок."""
+        response, data = self.get(reverse('api:group', args=['api']))
+        self.assertEqual(len(data['results']), 2)
+        response, data = self.get(reverse('api:profile',
+                                          args=['api_author']))
+        self.assertEqual(len(data['results']), 5)
+        response, data = self.get(reverse('api:group', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+        url = reverse('api:follow_index')
+        self.assertEqual(self.get(url)[0].status_code, 401)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response, data = self.get(url, self.authorized_client)
+        self.assertEqual(len(data['results']), 5)
+
+        texts = []
+        url += '?limit=2'
+        while url:
+            data = json.loads(self.authorized_client.get(url).content)
+            texts += [post['text'] for post in data['results']]
+            url = data['next']
+        self.assertEqual(texts, [f'post {i}' for i in range(4, -1, -1)])
+
+    def test_post_and_comments(self):
+        """Запись и её комментарии в порядке добавления."""
+        post = self.posts[0]
+        response, data = self.get(reverse('api:post', args=[post.id]))
+        self.assertEqual(data['comment_count'], 3)
+        self.assertEqual(data['author'], 'api_author')
+
+        response, data = self.get(reverse('api:comments', args=[post.id]),
+                                  fields='text')
+        self.assertEqual(data['results'],
+                         [{'text': f'comment {i}'} for i in range(3)])
+        self.assertEqual(
+            self.get(reverse('api:post', args=[0]))[0].status_code, 404)
@@ -0,0 +1,127 @@
+"""JSON versions of the post feeds, the post page and its comments.
+
+Every list is paginated with ``CursorPaginator`` (``?cursor=``, page size
+``?limit=``). ``?fields=a,b`` selects a subset of the fields. Rows are read
+with ``.values()`` and encoded with ``orjson`` if it is installed.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+
+from posts.models import Comment, Group, Post, User
+from posts.paginator import CURSOR_PARAM, CursorPaginator
+from posts.timeline import INBOX_ORDERING, follow_feed
+
+from .projections import COMMENT, POST, InvalidFields
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_response(data, status=200):
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False,
+                             separators=(',', ':')).encode()
+    return HttpResponse(content, status=status,
+                        content_type='application/json')
+
+
+def error(status, detail, **extra):
+    return json_response({'detail': detail, **extra}, status=status)
+
+
+def _page_size(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        limit = settings.API_PAGE_SIZE
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query[CURSOR_PARAM] = cursor
+    return request.build_absolute_uri('?' + query.urlencode())
+
+
+def paginated(request, queryset, projection, ordering, seek_on=None):
+    """Response with one cursor page of ``queryset``; ``seek_on`` is
+    passed to ``CursorPaginator``."""
+    try:
+        names = projection.parse(request.GET.get('fields'))
+    except InvalidFields as invalid:
+        return error(400, 'Unknown fields.', fields=invalid.args[0])
+    # Поля сортировки нужны курсору, даже если их не запросили
+    required = [name.lstrip('-') for name in ordering]
+    rows = projection.values(queryset, names, required)
+    paginator = CursorPaginator(rows, _page_size(request), ordering,
+                                seek_on)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return json_response({
+        'results': projection.serialize(page, names),
+        'next': _link(request, page.next_cursor),
+        'previous': _link(request, page.previous_cursor),
+    })
+
+
+def posts_page(request, queryset, seek_on=None):
+    return paginated(request, queryset, POST, ('-pub_date', '-id'), seek_on)
+
+
+@require_safe
+def index(request):
+    return posts_page(request, Post.objects.all())
+
+
+@require_safe
+def group_posts(request, slug):
+    group_id = (Group.objects.filter(slug=slug)
+                .values_list('pk', flat=True).first())
+    if group_id is None:
+        return error(404, 'Group not found.')
+    return posts_page(request, Post.objects.filter(group_id=group_id))
+
+
+@require_safe
+def profile(request, username):
+    author_id = (User.objects.filter(username=username)
+                 .values_list('pk', flat=True).first())
+    if author_id is None:
+        return error(404, 'User not found.')
+    return posts_page(request, Post.objects.filter(author_id=author_id))
+
+
+@require_safe
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error(401, 'Authentication required.')
+    return posts_page(request, follow_feed(request.user), INBOX_ORDERING)
+
+
+@require_safe
+def post_detail(request, post_id):
+    try:
+        names = POST.parse(request.GET.get('fields'))
+    except InvalidFields as invalid:
+        return error(400, 'Unknown fields.', fields=invalid.args[0])
+    rows = POST.values(Post.objects.filter(pk=post_id), names)
+    if not rows:
+        return error(404, 'Post not found.')
+    return json_response(POST.serialize(rows, names)[0])
+
+
+@require_safe
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Post not found.')
+    return paginated(request, Comment.objects.filter(post_id=post_id),
+                     COMMENT, ('created', 'id'))
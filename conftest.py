@@ -0,0 +1,10 @@
+import pytest
+from django.conf import settings
+
+
+@pytest.fixture(autouse=True, scope='session')
+def var_dirs(tmp_path_factory):
+    """Метрики и профили тестов пишутся во временный каталог, а не в
+    var/."""
+    settings.METRICS_DIR = str(tmp_path_factory.mktemp('metrics'))
+    settings.PROFILING_DIR = str(tmp_path_factory.mktemp('profiles'))
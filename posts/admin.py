@@ -1,13 +1,136 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.contrib.admin.helpers import ActionForm
+from django import forms
+from django.db import transaction
+from django.template.response import TemplateResponse
+from django.utils import timezone
+
+from .cache import bump, group_scope, post_scopes
 from .models import Comment, Post, Group, Follow
-
-
-class PostAdmin(admin.ModelAdmin):
-
-    list_display = ('pk', 'text', 'pub_date', 'author')
+from .paginator import admin_paginator
+from .search import filter_by_text
+
+
+def batches(queryset):
+    """Primary keys of ``queryset`` in lists of ``ADMIN_BATCH_SIZE``.
+
+    Each batch seeks past the last key of the previous one, so rows that
+    the previous batch changed or deleted do not shift the next.
+    """
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        rest = queryset if last is None else queryset.filter(pk__gt=last)
+        ids = list(rest.values_list('pk', flat=True)
+                   [:settings.ADMIN_BATCH_SIZE])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Changelist for big tables: a cached row count and no extra
+    ``COUNT(*)`` of the whole table; deletion in short transactions."""
+
+    show_full_result_count = False
+    actions = ['delete_in_batches']
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return admin_paginator(queryset, per_page, orphans=orphans,
+                               allow_empty_first_page=allow_empty_first_page)
+
+    def get_actions(self, request):
+        # delete_selected собирает все объекты ради страницы подтверждения
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_in_batches(self, request, queryset):
+        if request.POST.get('post') != 'yes':
+            return self.confirm_delete_in_batches(request, queryset)
+        model = queryset.model
+        deleted = 0
+        for ids in batches(queryset):
+            # счётчики и кэш обновляют сигналы удаления
+            with transaction.atomic():
+                deleted += model.objects.filter(pk__in=ids).delete()[1].get(
+                    model._meta.label, 0)
+        self.message_user(request, f'Удалено: {deleted}')
+
+    delete_in_batches.allowed_permissions = ('delete',)
+    delete_in_batches.short_description = 'Удалить выбранные (пачками)'
+
+    def confirm_delete_in_batches(self, request, queryset):
+        """Confirmation page that shows only how many rows will go;
+        the form posts the same selection back with ``post=yes``."""
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Вы уверены?',
+            'opts': self.model._meta,
+            'count': queryset.count(),
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'media': self.media,
+        }
+        request.current_app = self.admin_site.name
+        return TemplateResponse(
+            request, 'admin/delete_in_batches_confirmation.html', context)
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(Group.objects.all(), required=False,
+                                   label='Сообщество',
+                                   empty_label='без сообщества')
+
+
+class PostAdmin(ScalableAdmin):
+
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
+    # поиск идёт по тексту в полнотекстовом индексе (см. get_search_results)
     search_fields = ('text',)
+    # фильтр отбирает диапазоны дат по индексу post_pub_date; иерархии
+    # дат нет - её первый уровень перебирает годы всех строк таблицы
     list_filter = ('pub_date',)
+    autocomplete_fields = ('author', 'group')
     empty_value_display = '-пусто-'
+    action_form = PostActionForm
+    actions = ['move_to_group', 'delete_in_batches']
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return filter_by_text(queryset, search_term), False
+
+    def move_to_group(self, request, queryset):
+        group_id = request.POST.get('group') or None
+        group = Group.objects.filter(pk=group_id).first() if group_id else None
+        if group_id and group is None:
+            self.message_user(request, 'Сообщество не найдено')
+            return
+        moved = 0
+        for ids in batches(queryset):
+            batch = Post.objects.filter(pk__in=ids)
+            # update() минует сигналы, поэтому ленты сбрасываем сами:
+            # и прежних сообществ и авторов, и нового сообщества
+            scopes = {group_scope(group.id)} if group else set()
+            for author_id, old_group_id in (batch.order_by()
+                                            .values_list('author_id',
+                                                         'group_id')
+                                            .distinct()):
+                scopes.update(post_scopes(author_id, old_group_id))
+            with transaction.atomic():
+                moved += batch.update(group=group, updated_at=timezone.now())
+                bump(*scopes)
+        self.message_user(request, f'Перенесено записей: {moved}')
+
+    move_to_group.allowed_permissions = ('change',)
+    move_to_group.short_description = 'Перенести в выбранное сообщество'
 
 
 admin.site.register(Post, PostAdmin)
@@ -16,26 +139,33 @@ admin.site.register(Post, PostAdmin)
 class GroupAdmin(admin.ModelAdmin):
 
     list_display = ('pk', 'title', 'description')
-    search_fields = ('description',)
+    # по названию сообщество ищут в автодополнении PostAdmin
+    search_fields = ('title', 'description')
     empty_value_display = '-пусто-'
 
 
 admin.site.register(Group, GroupAdmin)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdmin):
 
     list_display = ('author', 'text', 'post', 'created')
-    search_fields = ('author', 'text',)
+    list_select_related = ('author', 'post')
+    search_fields = ('=author__username',)
+    # диапазоны дат - по индексу comment_created
+    list_filter = ('created',)
+    autocomplete_fields = ('author', 'post')
 
 
 admin.site.register(Comment, CommentAdmin)
 
 
-class CommentFollow(admin.ModelAdmin):
+class CommentFollow(ScalableAdmin):
 
     list_display = ('user', 'author', )
-    search_fields = ('user', 'author',)
+    list_select_related = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    autocomplete_fields = ('user', 'author')
 
 
 admin.site.register(Follow, CommentFollow)
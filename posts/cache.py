@@ -0,0 +1,173 @@
+"""Generation counters for the cached feed pages.
+
+Every scope (all posts, the posts of one group, the posts of one author) has
+a counter in the cache that is incremented whenever a post or a comment in
+that scope changes. The counter is part of the fragment cache key of the
+feed pages, so a page stays cached until something it shows has changed and
+is re-rendered right after that - there is no fixed stale window.
+
+The follow feed of a user mixes many authors, so its key is built from the
+generation of the user's subscriptions and the generations of every author
+they follow: a new post invalidates the followers' feeds without touching
+(or even listing) the followers.
+
+The counters are only as shared as the cache: with ``LocMemCache`` every
+process has its own and does not see the bumps made by the others, so
+``generation_timeout`` keeps whatever is keyed by them for a few seconds
+only.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+
+from django.core.cache import cache
+from django.db import transaction
+
+from yatube.caches import is_shared
+
+from .models import Follow
+from .paginator import CURSOR_PARAM
+
+GLOBAL = 'global'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def following_scope(user_id):
+    """Changes whenever ``user_id`` follows or unfollows someone."""
+    return f'following:{user_id}'
+
+
+def followers_scope(author_id):
+    """Changes whenever someone follows or unfollows ``author_id``."""
+    return f'followers:{author_id}'
+
+
+def post_scopes(author_id, group_id):
+    """Scopes whose pages show a post of ``author_id`` in ``group_id``."""
+    scopes = [GLOBAL, author_scope(author_id)]
+    if group_id:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def count_key(scope):
+    """Cache key of the number of posts in ``scope``."""
+    return f'feed_count:{scope}'
+
+
+def forget_count(scope):
+    """Drop the cached number of posts in ``scope``, now and once more
+    after the commit (see ``bump``)."""
+    cache.delete(count_key(scope))
+    transaction.on_commit(lambda: cache.delete(count_key(scope)))
+
+
+def generation_timeout(timeout):
+    """``timeout`` for a cache entry keyed by generations, cut down to
+    ``LOCAL_GENERATION_TIMEOUT`` when the cache is not shared."""
+    if is_shared():
+        return timeout
+    return min(timeout, settings.LOCAL_GENERATION_TIMEOUT)
+
+
+def _key(scope):
+    return f'generation:{scope}'
+
+
+def _initial():
+    # Начинаем с текущего времени: если кэш вытеснит счётчик, новое
+    # значение не совпадёт ни с одним из уже выданных
+    return int(time.time() * 1000)
+
+
+def get_generation(scope):
+    key = _key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _initial(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_generations(scopes):
+    """Like ``get_generation`` for many scopes with one cache round trip."""
+    keys = {_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    generations = {keys[key]: value for key, value in found.items()}
+    for key in keys.keys() - found.keys():
+        generations[keys[key]] = get_generation(keys[key])
+    return generations
+
+
+def _increment(scopes):
+    for scope in scopes:
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            # Счётчика нет в кэше - следующее чтение начнёт новое поколение
+            cache.add(_key(scope), _initial(), None)
+
+
+def bump(*scopes):
+    """Start a new generation of ``scopes``.
+
+    The counters are bumped right away and once more after the commit: a
+    page rendered between the two from the not yet committed data would
+    otherwise stay cached under the new generation.
+    """
+    _increment(scopes)
+    transaction.on_commit(lambda: _increment(scopes))
+
+
+def feed_version(request, scope):
+    """Cache key part for the feed page of ``scope`` requested by
+    ``request``: the scope's generation and the requested page."""
+    cursor = request.GET.get(CURSOR_PARAM)
+    page = (f'cursor={cursor}' if cursor is not None
+            else f'page={request.GET.get("page", "")}')
+    return f'{scope}:{get_generation(scope)}:{page}'
+
+
+def followed_authors(user_id):
+    """Ids of the authors ``user_id`` follows, cached until they change."""
+    generation = get_generation(following_scope(user_id))
+    key = f'followed_authors:{user_id}:{generation}'
+    authors = cache.get(key)
+    if authors is None:
+        authors = list(Follow.objects.filter(user_id=user_id)
+                       .values_list('author_id', flat=True))
+        cache.set(key, authors,
+                  generation_timeout(settings.FOLLOW_FEED_CACHE_TIMEOUT))
+    return authors
+
+
+def follow_feed_version(request):
+    """Cache key part for the follow feed page of ``request.user``.
+
+    Only the first ``FOLLOW_FEED_CACHE_PAGES`` pages are cached; ``None``
+    is returned for the deeper ones.
+    """
+    if request.GET.get(CURSOR_PARAM) is not None:
+        return None
+    try:
+        page = int(request.GET.get('page') or 1)
+    except ValueError:
+        return None
+    if not 1 <= page <= settings.FOLLOW_FEED_CACHE_PAGES:
+        return None
+
+    user_id = request.user.pk
+    authors = sorted(followed_authors(user_id))
+    generations = get_generations(author_scope(author) for author in authors)
+    state = ','.join(f'{author}:{generations[author_scope(author)]}'
+                     for author in authors)
+    digest = hashlib.md5(state.encode()).hexdigest()
+    return f'{following_scope(user_id)}:{digest}:page={page}'
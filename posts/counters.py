@@ -0,0 +1,66 @@
+"""Denormalized counters kept on ``Post`` and ``UserStats``.
+
+The signal handlers in ``posts.signals`` adjust the counters by one on every
+create/delete; the ``recount_*`` functions below recompute them from scratch
+for the ``recount_counters`` command. Both take an ``apps`` registry, the
+global one by default.
+"""
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def change(model, pk, field, delta, **values):
+    """Atomically add ``delta`` to ``field`` of the row ``pk`` and set the
+    other ``values`` in the same UPDATE."""
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        # Не уводим счётчик в минус, если он уже разошёлся с данными
+        queryset = queryset.filter(**{'%s__gte' % field: -delta})
+    queryset.update(**{field: F(field) + delta}, **values)
+
+
+def _count_of(model, field):
+    """Subquery counting rows of ``model`` whose ``field`` is the outer pk."""
+    rows = (model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field).annotate(total=Count('pk'))
+            .values('total'))
+    return Coalesce(Subquery(rows), 0)
+
+
+def _recount(queryset, **counters):
+    """Fix every row of ``queryset`` whose counters differ from
+    ``counters``; return the number of rows that had drifted."""
+    drifted = 0
+    for field, expression in counters.items():
+        rows = (queryset.annotate(actual=expression)
+                .exclude(**{field: F('actual')}))
+        drifted += rows.count()
+    queryset.update(**counters)
+    return drifted
+
+
+def recount_comments(apps=global_apps):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    return _recount(Post.objects.all(),
+                    comment_count=_count_of(Comment, 'post'))
+
+
+def recount_user_stats(apps=global_apps):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    missing = User.objects.filter(stats__isnull=True).values_list('pk',
+                                                                  flat=True)
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in missing.iterator()),
+        batch_size=500,
+    )
+    return _recount(UserStats.objects.all(),
+                    posts_count=_count_of(Post, 'author'),
+                    followers_count=_count_of(Follow, 'author'),
+                    following_count=_count_of(Follow, 'user'))
@@ -0,0 +1,23 @@
+"""Querysets shared by the post feeds.
+
+Every feed renders its posts through ``posts/post_item.html``, which shows
+the author's username, the group's slug and title and the comment counter.
+``feed_queryset`` joins author and group in the same query and loads only
+those columns, so a page of posts costs one query regardless of its size.
+"""
+from .models import Post
+
+# Колонки, которые выводит posts/post_item.html
+FEED_FIELDS = (
+    'text', 'pub_date', 'updated_at', 'image', 'image_width', 'image_height',
+    'comment_count',
+    'author', 'author__username',
+    'group', 'group__slug', 'group__title',
+)
+
+
+def feed_queryset(queryset=None):
+    """Prepare ``queryset`` (all posts by default) for feed rendering."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.select_related('author', 'group').only(*FEED_FIELDS)
@@ -1,5 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from .images import ImageProcessingError, process_upload
 from .models import Post, Comment
+from .validators import validate_image_pixels, validate_upload_size
 
 
 class PostForm(forms.ModelForm):
@@ -7,6 +10,51 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['image'].validators.append(validate_image_pixels)
+        self.upload_error = None
+        self.processed_image = None
+        name = self.add_prefix('image')
+        upload = self.files.get(name)
+        if upload is not None:
+            try:
+                validate_upload_size(upload)
+            except forms.ValidationError as error:
+                # Обрезанный файл не передаём в ImageField - он не откроется
+                self.files = self.files.copy()
+                del self.files[name]
+                self.upload_error = error
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if image is False:
+            # Картинку удалили
+            self.instance.image_width = self.instance.image_height = None
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            image = process_upload(image)
+        except ImageProcessingError:
+            raise forms.ValidationError(
+                'Не удалось обработать изображение.', code='invalid_image')
+        self.instance.image_width, self.instance.image_height = (
+            image.image_size)
+        self.processed_image = image
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.upload_error is not None:
+            self.add_error('image', self.upload_error)
+        return cleaned_data
+
+    def close_image(self):
+        """Close the re-encoded image once the post is saved: the storage
+        has moved the temporary file or kept an identical file instead."""
+        if self.processed_image is not None:
+            self.processed_image.close()
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,114 @@
+"""Re-encoding of uploaded images in a separate process pool.
+
+Decoding a photo takes memory proportional to its pixel count, so it is
+done in ``IMAGE_WORKERS`` worker processes instead of the web worker. The
+worker reads the upload from its temporary file, applies the EXIF
+orientation, scales the picture down to ``IMAGE_MAX_SIDE`` and writes it
+back as JPEG, or as WebP if it has transparency. The result has no EXIF
+data. Only file paths cross the process boundary.
+"""
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps
+
+EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+_executor = None
+
+
+class ImageProcessingError(Exception):
+    pass
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: дочерний процесс не наследует соединения и потоки воркера
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def _has_alpha(image):
+    return (image.mode in ('RGBA', 'LA', 'PA')
+            or (image.mode == 'P' and 'transparency' in image.info))
+
+
+def reencode(source, target, max_side, max_pixels, quality):
+    """Runs in a worker process: convert the image at path ``source`` and
+    write it to path ``target``. Return the output format and size."""
+    # Бомбы отсекаются ещё при разборе заголовка
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(source) as image:
+        if image.width * image.height > max_pixels:
+            raise ImageProcessingError('too many pixels')
+        # JPEG можно сразу декодировать в уменьшенном масштабе
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        if _has_alpha(image):
+            image, format = image.convert('RGBA'), 'WEBP'
+        else:
+            image, format = image.convert('RGB'), 'JPEG'
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        # Без параметра exif метаданные в файл не попадают
+        image.save(target, format, quality=quality, optimize=True)
+    return format, image.size
+
+
+def process(source, target):
+    """Re-encode the image at path ``source`` into path ``target`` in the
+    process pool; return the format, ``'JPEG'`` or ``'WEBP'``, and the
+    ``(width, height)`` of the result.
+
+    Raise ``ImageProcessingError`` if the image cannot be processed.
+    """
+    global _executor
+    try:
+        future = _get_executor().submit(
+            reencode, source, target, settings.IMAGE_MAX_SIDE,
+            settings.IMAGE_MAX_PIXELS, settings.IMAGE_QUALITY)
+        return future.result(timeout=settings.IMAGE_PROCESS_TIMEOUT)
+    except BrokenProcessPool:
+        # Воркер упал (например, его убил OOM killer) - пул пересоздаём
+        _executor = None
+        raise ImageProcessingError('worker died')
+    except TimeoutError:
+        raise ImageProcessingError('timeout')
+    except ImageProcessingError:
+        raise
+    except Exception as error:
+        raise ImageProcessingError(error) from error
+
+
+def process_upload(upload):
+    """Return a re-encoded copy of ``upload`` as a new temporary file; its
+    ``image_size`` is the ``(width, height)`` of the picture."""
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    target = TemporaryUploadedFile(stem, None, 0, None)
+    try:
+        if hasattr(upload, 'temporary_file_path'):
+            format, size = process(upload.temporary_file_path(),
+                                   target.temporary_file_path())
+        else:
+            # Загрузка в памяти (например, форма создана не из запроса)
+            with tempfile.NamedTemporaryFile() as source:
+                for chunk in upload.chunks():
+                    source.write(chunk)
+                source.flush()
+                format, size = process(source.name,
+                                       target.temporary_file_path())
+    except Exception:
+        target.close()
+        raise
+    target.name = stem + EXTENSIONS[format]
+    target.content_type = Image.MIME[format]
+    target.size = os.path.getsize(target.temporary_file_path())
+    target.image_size = size
+    return target
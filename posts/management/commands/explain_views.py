@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from posts import urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def plan_warnings(detail):
+    """Return what is suspicious about one ``EXPLAIN QUERY PLAN`` row."""
+    warnings = []
+    if (detail.startswith('SCAN') and 'INDEX' not in detail
+            and 'CONSTANT ROW' not in detail):
+        warnings.append('полный просмотр таблицы')
+    if 'TEMP B-TREE' in detail:
+        warnings.append('сортировка во временном B-tree')
+    return warnings
+
+
+class Command(BaseCommand):
+    help = ('Открывает каждый адрес из posts/urls.py на тестовых данных и '
+            'выводит EXPLAIN QUERY PLAN для всех SQL-запросов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100,
+                            help='Сколько записей создать для проверки')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN поддерживается '
+                               'только для SQLite')
+        flagged = 0
+        # Тестовые данные живут только внутри транзакции и откатываются.
+        # Кэш откатить нельзя, поэтому страницы с ними кэшируются в
+        # отдельном, а не в общем кэше сайта
+        isolated = {
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.'
+                               'LocMemCache',
+                    'LOCATION': f'explain_views_{alias}'}
+            for alias in settings.CACHES
+        }
+        with override_settings(CACHES=isolated), transaction.atomic():
+            client, url_kwargs = self.seed(options['posts'])
+            for pattern in urls.urlpatterns:
+                flagged += self.explain(client, pattern, url_kwargs)
+            transaction.set_rollback(True)
+        self.stdout.write(f'Подозрительных планов: {flagged}')
+
+    def seed(self, count):
+        author = User.objects.create(username='explain_author')
+        reader = User.objects.create(username='explain_reader')
+        group = Group.objects.create(title='explain', slug='explain',
+                                     description='explain')
+        Post.objects.bulk_create(
+            Post(text=f'explain {i}', author=author, group=group)
+            for i in range(count))
+        post = Post.objects.filter(author=author).first()
+        Follow.objects.create(user=reader, author=author)
+        Comment.objects.create(post=post, author=reader, text='explain')
+
+        client = Client()
+        client.force_login(reader)
+        url_kwargs = {
+            'username': author.username,
+            'slug': group.slug,
+            'post_id': post.id,
+        }
+        return client, url_kwargs
+
+    def explain(self, client, pattern, url_kwargs):
+        name = f'{urls.app_name}:{pattern.name}'
+        kwargs = {key: url_kwargs[key] for key in pattern.pattern.converters}
+        url = reverse(name, kwargs=kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            try:
+                client.get(url)
+            except Exception as error:
+                self.stdout.write(f'{name} GET {url}: ошибка {error!r}')
+                return 0
+        self.stdout.write(f'{name} GET {url} ({len(queries)} запросов)')
+
+        flagged = 0
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                self.stdout.write(f'  {sql}')
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                for *_, detail in cursor.fetchall():
+                    warnings = plan_warnings(detail)
+                    flagged += bool(warnings)
+                    marker = '!!' if warnings else '  '
+                    suffix = f'  <- {", ".join(warnings)}' if warnings else ''
+                    self.stdout.write(f'  {marker} {detail}{suffix}')
+        return flagged
@@ -0,0 +1,55 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+def _init_worker():
+    # Дочерний процесс не должен пользоваться соединениями родителя
+    django.setup()
+    for connection in connections.all():
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры всех размеров для уже загруженных картинок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов (по умолчанию - число ядер)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=20,
+            help='Сколько картинок процесс получает за раз')
+
+    def handle(self, *args, workers, chunk_size, **options):
+        names = list(Post.objects.exclude(image='')
+                     .values_list('image', flat=True).distinct())
+        if workers <= 1:
+            self.save_results(names, map(generate, names))
+            return
+
+        # Соединения не должны попасть в дочерние процессы при fork
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker) as executor:
+            self.save_results(
+                names, executor.map(generate, names, chunksize=chunk_size))
+
+    def save_results(self, names, sizes):
+        done = failed = 0
+        for name, size in zip(names, sizes):
+            if size is None:
+                failed += 1
+                continue
+            done += 1
+            # Заодно запоминаем размеры картинок, загруженных до их учёта
+            width, height = size
+            Post.objects.filter(image=name, image_width__isnull=True).update(
+                image_width=width, image_height=height)
+        self.stdout.write(f'Обработано картинок: {done}, с ошибками: {failed}')
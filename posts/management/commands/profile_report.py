@@ -0,0 +1,58 @@
+import io
+import pstats
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from yatube.profiling import profile_files
+
+
+class Command(BaseCommand):
+    help = ('Сводит профили запросов, собранные ProfilingMiddleware, '
+            'и выводит самые затратные функции каждого view')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help='Имя URL (posts:profile); можно указать несколько раз')
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Сколько функций выводить для каждого view')
+        parser.add_argument(
+            '--sort', default='cumulative',
+            choices=['cumulative', 'tottime', 'calls'],
+            help='Порядок функций')
+        parser.add_argument(
+            '--dir', dest='directory',
+            help='Каталог профилей вместо PROFILING_DIR')
+
+    def handle(self, *args, views, top, sort, directory, **options):
+        by_view = defaultdict(list)
+        for view, path in profile_files(directory):
+            if views is None or view in views:
+                by_view[view].append(path)
+        if not by_view:
+            self.stdout.write('Профилей нет')
+            return
+
+        for view, paths in sorted(by_view.items()):
+            stats = None
+            loaded = 0
+            for path in paths:
+                try:
+                    if stats is None:
+                        stats = pstats.Stats(path, stream=io.StringIO())
+                    else:
+                        stats.add(path)
+                    loaded += 1
+                except (OSError, EOFError, ValueError, TypeError):
+                    # файл удалили при ротации или он повреждён
+                    continue
+            if stats is None:
+                continue
+            stats.stream = io.StringIO()
+            # Иначе pstats начнёт сводку со списка всех файлов
+            stats.files = []
+            stats.sort_stats(sort).print_stats(top)
+            self.stdout.write(f'{view}: профилей {loaded}')
+            self.stdout.write(stats.stream.getvalue())
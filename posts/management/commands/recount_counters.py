@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_comments, recount_user_stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные счётчики комментариев, '
+            'записей и подписок')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            comments = recount_comments()
+            stats = recount_user_stats()
+        self.stdout.write(
+            f'Исправлено постов: {comments}, '
+            f'счётчиков пользователей: {stats}')
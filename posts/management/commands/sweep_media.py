@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts.media_sweep import MediaSweeper
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки и миниатюры, на которые не ссылается '
+            'ни одна запись. Каждый запуск продолжает с места предыдущего')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=10000,
+            help='Сколько файлов проверить за запуск')
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько файлов проверять одним запросом к БД')
+        parser.add_argument(
+            '--pause', type=float, default=0.5,
+            help='Пауза между пачками, в секундах')
+        parser.add_argument(
+            '--min-age', type=int, default=24 * 60 * 60,
+            help='Файлы моложе этого числа секунд не удаляются')
+        parser.add_argument(
+            '--nice', type=int, default=10,
+            help='Насколько понизить приоритет процесса (0 - не менять)')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, ничего не удалять')
+
+    def handle(self, *args, limit, batch_size, pause, min_age, nice,
+               dry_run, **options):
+        if nice and hasattr(os, 'nice'):
+            # Уступаем процессор веб-воркерам
+            os.nice(nice)
+        sweeper = MediaSweeper(batch_size=batch_size, pause=pause,
+                               limit=limit, min_age=min_age, dry_run=dry_run)
+        checked, deleted = sweeper.sweep()
+        verb = 'К удалению' if dry_run else 'Удалено'
+        self.stdout.write(f'Проверено файлов: {checked}. {verb}: {deleted}')
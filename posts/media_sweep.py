@@ -0,0 +1,147 @@
+"""Removal of media files that no post references.
+
+Replacing ``Post.image`` or deleting a post (directly or through the
+``CASCADE`` from its author) leaves the upload and its thumbnails on
+disk. ``MediaSweeper`` walks ``MEDIA_ROOT/posts/`` and sorl's thumbnail
+directory in a stable order. Each run checks at most ``limit`` files and
+continues from where the previous run stopped; the position is kept in
+``MEDIA_ROOT/.sweep-cursor``, so runs stay short. Files are checked a
+batch at a time, uploads against the posts and thumbnails against sorl's
+key-value store, with a pause between batches. Files younger than
+``min_age`` are kept: they may belong to a post that is not committed
+yet.
+"""
+import json
+import os
+import time
+
+from django.conf import settings
+from sorl.thumbnail import default, delete as delete_with_thumbnails
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+from .thumbnails import registered_thumbnails
+
+CURSOR_FILE = '.sweep-cursor'
+
+
+def walk(root, start_after=None):
+    """Yield the paths of files under ``root``, relative to it, in sorted
+    order, starting after the path ``start_after``."""
+    after = tuple(start_after.split('/')) if start_after else ()
+
+    def scan(directory, parts):
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            path = parts + (entry.name,)
+            # Каталоги целиком до курсора пропускаем, не заходя в них
+            if path < after[:len(path)]:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan(entry.path, path)
+            elif entry.is_file(follow_symlinks=False) and path > after:
+                yield '/'.join(path)
+
+    yield from scan(root, ())
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class MediaSweeper:
+
+    def __init__(self, batch_size=100, pause=0.5, limit=10000,
+                 min_age=24 * 60 * 60, dry_run=False):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.limit = limit
+        self.min_age = min_age
+        self.dry_run = dry_run
+        self.storage = Post._meta.get_field('image').storage
+        self.cursor_path = os.path.join(settings.MEDIA_ROOT, CURSOR_FILE)
+
+    def load_cursors(self):
+        try:
+            with open(self.cursor_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cursors(self, cursors):
+        if not self.dry_run:
+            with open(self.cursor_path, 'w') as file:
+                json.dump(cursors, file)
+
+    def is_old(self, full_path, now):
+        try:
+            return now - os.stat(full_path).st_mtime >= self.min_age
+        except FileNotFoundError:
+            return False
+
+    def sweep(self):
+        """Run one pass over both directories; return the number of files
+        checked and deleted."""
+        cursors = self.load_cursors()
+        checked = deleted = 0
+        for directory, find_orphans, remove in (
+                ('posts', self.orphan_uploads, self.delete_upload),
+                (sorl_settings.THUMBNAIL_PREFIX.strip('/'),
+                 self.orphan_thumbnails, self.delete_thumbnail)):
+            root = os.path.join(settings.MEDIA_ROOT, directory)
+            start_after = cursors.get(directory)
+            files = walk(root, start_after)
+            last = None
+            for batch in _batches(files, self.batch_size):
+                names = ['%s/%s' % (directory, path) for path in batch]
+                now = time.time()
+                for name in find_orphans(names):
+                    if self.is_old(os.path.join(settings.MEDIA_ROOT, name),
+                                   now):
+                        if not self.dry_run:
+                            remove(name)
+                        deleted += 1
+                checked += len(batch)
+                last = batch[-1]
+                if checked >= self.limit:
+                    break
+                # Не мешаем веб-воркерам ни диском, ни базой
+                time.sleep(self.pause)
+            else:
+                # Каталог пройден до конца - следующий запуск начнёт сначала
+                last = None
+            cursors[directory] = last
+            self.save_cursors(cursors)
+            if checked >= self.limit:
+                break
+        return checked, deleted
+
+    def orphan_uploads(self, names):
+        referenced = set(Post.objects.filter(image__in=names)
+                         .values_list('image', flat=True))
+        return [name for name in names if name not in referenced]
+
+    def delete_upload(self, name):
+        # sorl удаляет и миниатюры, которые успел записать в своё хранилище
+        delete_with_thumbnails(ImageFile(name, self.storage))
+
+    def orphan_thumbnails(self, names):
+        # Миниатюры картинок, которые ещё используются, есть в хранилище
+        # sorl; миниатюры удалённых картинок sorl забывает вместе с ними
+        registered = registered_thumbnails(names)
+        return [name for name in names if name not in registered]
+
+    def delete_thumbnail(self, name):
+        # Записи о ней в хранилище sorl нет - иначе она бы не попала сюда
+        default.storage.delete(name)
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db import migrations
+
+# Схема индекса на момент миграции - не импортируется из posts.search,
+# чтобы миграция не менялась вместе с кодом поиска
+NEW_ROW = (
+    "INSERT INTO posts_post_fts(rowid, text, author, grp) VALUES (new.id, "
+    "new.text, (SELECT username FROM {users} WHERE id = new.author_id), "
+    "COALESCE((SELECT title FROM posts_group WHERE id = new.group_id), "
+    "''));"
+)
+
+TRIGGERS = [
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    + NEW_ROW + " END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text, author_id, "
+    "group_id ON posts_post WHEN old.text IS NOT new.text "
+    "OR old.author_id IS NOT new.author_id "
+    "OR old.group_id IS NOT new.group_id BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; " + NEW_ROW + " END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER posts_post_fts_author AFTER UPDATE OF username ON {users} "
+    "WHEN old.username IS NOT new.username BEGIN "
+    "UPDATE posts_post_fts SET author = new.username WHERE rowid IN "
+    "(SELECT id FROM posts_post WHERE author_id = new.id); END",
+    "CREATE TRIGGER posts_post_fts_group AFTER UPDATE OF title ON posts_group "
+    "WHEN old.title IS NOT new.title BEGIN "
+    "UPDATE posts_post_fts SET grp = new.title WHERE rowid IN "
+    "(SELECT id FROM posts_post WHERE group_id = new.id); END",
+]
+
+TRIGGER_NAMES = ('insert', 'update', 'delete', 'author', 'group')
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    users = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_post_fts USING fts5(text, author, grp, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '3')")
+    for sql in TRIGGERS:
+        schema_editor.execute(sql.format(users=users))
+    schema_editor.execute(
+        "INSERT INTO posts_post_fts(rowid, text, author, grp) "
+        "SELECT p.id, p.text, u.username, COALESCE(g.title, '') "
+        "FROM posts_post p JOIN {users} u ON u.id = p.author_id "
+        "LEFT JOIN posts_group g ON g.id = p.group_id".format(users=users))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in TRIGGER_NAMES:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS posts_post_fts_{name}')
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_post_image_size'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
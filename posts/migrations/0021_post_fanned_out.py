@@ -0,0 +1,46 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+
+# SQLite пересоздаёт posts_post при добавлении поля: триггеры поискового
+# индекса на время пересоздания снимаются и ставятся заново такими же,
+# как в 0018
+search = import_module('posts.migrations.0018_post_search')
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in search.TRIGGER_NAMES:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS posts_post_fts_{name}')
+
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    users = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    for sql in search.TRIGGERS:
+        schema_editor.execute(sql.format(users=users))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0020_feed_entry_pub_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_triggers, create_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(fanned_out=False), fields=['author', '-pub_date', '-id'], name='post_not_fanned_out'),
+        ),
+    ]
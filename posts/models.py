@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from .storage import post_images
 from .validators import validate_not_empty
 
 User = get_user_model()
@@ -18,6 +19,8 @@ class Post(models.Model):
     text = models.TextField(verbose_name='Запись',
                             help_text='Сделайте запись Вашего поста')
     pub_date = models.DateTimeField('date published', auto_now_add=True)
+    # меняется и при новом комментарии - по нему кэшируется карточка поста
+    updated_at = models.DateTimeField('date updated', auto_now=True)
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                related_name='posts')
@@ -29,13 +32,39 @@ class Post(models.Model):
                               help_text='Выбирите группу, куда попадет пост',
                               validators=[validate_not_empty])
     # поле для картинки
+    # одинаковые картинки хранятся одним файлом с именем по хэшу
     image = models.ImageField(upload_to='posts/',
+                              storage=post_images,
                               verbose_name='Изображение',
                               help_text='Загрузите изображение',
                               blank=True, null=True)
+    # размеры картинки запоминаются при загрузке, чтобы не открывать файл
+    image_width = models.PositiveIntegerField(null=True, blank=True,
+                                              editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True,
+                                               editable=False)
+    # счётчик комментариев, чтобы лента не считала их для каждого поста
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # разложена ли запись по лентам подписчиков при публикации; записи
+    # популярных авторов подмешиваются в ленту при чтении
+    fanned_out = models.BooleanField(default=True, editable=False)
 
     class Meta:
-        ordering = ['-pub_date']
+        # id различает записи с одинаковой датой - порядок ленты однозначен
+        ordering = ['-pub_date', '-id']
+        # индексы под ленты: главная, автора и сообщества
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date'),
+            # записи для подмешивания в ленту подписок
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_not_fanned_out',
+                         condition=models.Q(fanned_out=False)),
+        ]
 
     # выводим текст поста
     def __str__(self):
@@ -52,6 +81,15 @@ class Comment(models.Model):
     text = models.TextField(validators=[validate_not_empty])
     created = models.DateTimeField('date published', auto_now_add=True)
 
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created'),
+            # фильтр комментариев по дате в админке (list_filter)
+            models.Index(fields=['created'], name='comment_created'),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(User,
@@ -66,3 +104,71 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique_followings'),
         ]
+        # подписчики автора: счётчики и рассылка записей по лентам
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user'),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя: записи, подписчики и подписки.
+
+    Обновляются сигналами в той же транзакции, что и сами записи;
+    расхождения исправляет команда ``recount_counters``.
+    """
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='stats')
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def for_user(cls, user):
+        """Return the stats of ``user``, creating the row if it is missing."""
+        try:
+            return user.stats
+        except cls.DoesNotExist:
+            stats, _ = cls.objects.get_or_create(
+                user=user,
+                defaults={
+                    'posts_count': user.posts.count(),
+                    'followers_count': user.following.count(),
+                    'following_count': user.follower.count(),
+                })
+            user.stats = stats
+            return stats
+
+
+class FeedEntry(models.Model):
+    """Запись в материализованной ленте подписок пользователя.
+
+    Новые записи автора раскладываются по лентам подписчиков при
+    публикации; автор дублируется здесь, чтобы отписка удаляла строки
+    без соединения с ``Post``, а дата публикации - чтобы лента листалась
+    по индексу этой таблицы.
+    """
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='+')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='feed_entry_user_author'),
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='feed_entry_user_pub_date'),
+        ]
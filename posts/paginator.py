@@ -0,0 +1,267 @@
+"""Paginators for the post feeds.
+
+``Paginator`` runs ``COUNT(*)`` on every request and turns page N into
+``LIMIT 10 OFFSET 10 * (N - 1)``, so every deep page re-reads all the rows
+before it. ``feed_paginator`` builds a plain ``Paginator`` that takes the
+count from a denormalized counter or the cache instead. ``CursorPaginator``
+seeks straight to the position after (or before) a given ``(pub_date, id)``
+pair, which costs the same on any page and does not shift when new posts
+are published between two page loads. ``admin_paginator`` brings the cached
+count to the filtered admin changelists and an estimate to the unfiltered
+ones.
+"""
+import hashlib
+import json
+from collections.abc import Sequence
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Max, Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+CURSOR_PARAM = 'cursor'
+# Совпадает с Post.Meta.ordering; последнее поле уникально
+FEED_ORDERING = ('-pub_date', '-id')
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def feed_paginator(object_list, per_page, count=None, count_key=None,
+                   **kwargs):
+    """``Paginator`` that does not count the rows on every request.
+
+    The count is ``count`` if the caller passes one (e.g. a denormalized
+    counter), otherwise it is cached under ``count_key`` for
+    ``FEED_COUNT_CACHE_TIMEOUT`` seconds. Such a count may lag behind the
+    table, so ``estimated`` is set; take the pages with ``feed_page``.
+    """
+    paginator = Paginator(object_list, per_page, **kwargs)
+    if count is None and count_key is not None:
+        count = cache.get(count_key)
+        if count is None:
+            count = paginator.count
+            cache.set(count_key, count, settings.FEED_COUNT_CACHE_TIMEOUT)
+    if count is not None:
+        # count у Paginator - cached_property, готовое значение заменяет
+        # COUNT(*)
+        paginator.count = count
+    paginator.estimated = count is not None
+    return paginator
+
+
+def feed_page(paginator, number, max_number=None):
+    """``paginator.get_page(number)`` that slices the page without
+    clipping it to the count: a stale count only affects the page links.
+    Numbers past ``max_number`` get that page."""
+    try:
+        number = paginator.validate_number(number)
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        number = paginator.num_pages
+    if max_number is not None:
+        number = min(number, max_number)
+    bottom = (number - 1) * paginator.per_page
+    return Page(paginator.object_list[bottom:bottom + paginator.per_page],
+                number, paginator)
+
+
+def add_cursors(page, ordering=FEED_ORDERING, seek_on=None):
+    """Give a numbered feed ``page`` the ``next_cursor`` and
+    ``previous_cursor`` of a ``CursorPage``, so that its neighbours are
+    linked by cursor and not by ``OFFSET``.
+
+    They are methods: the page's rows are read only when a template
+    prints the links (templates call them), and ``cursor_paginator``
+    lets ``stream_feed`` encode them from the rows it streams.
+    """
+    cursors = CursorPaginator(page.paginator.object_list,
+                              page.paginator.per_page, ordering, seek_on)
+
+    def next_cursor():
+        if page.has_next() and len(page):
+            return cursors.encode_cursor(page[-1], NEXT)
+        return None
+
+    def previous_cursor():
+        if page.has_previous() and len(page):
+            return cursors.encode_cursor(page[0], PREVIOUS)
+        return None
+
+    page.cursor_paginator = cursors
+    page.next_cursor = next_cursor
+    page.previous_cursor = previous_cursor
+    return page
+
+
+def estimated_count(queryset):
+    """The number of rows in the table of ``queryset``'s model, estimated
+    by the largest primary key: deleted rows are still counted, but the
+    index gives it without reading the table."""
+    return queryset.model._default_manager.aggregate(
+        largest=Max('pk'))['largest'] or 0
+
+
+def admin_paginator(queryset, per_page, **kwargs):
+    """``feed_paginator`` for an admin changelist.
+
+    The unfiltered changelist takes ``estimated_count``; the count of
+    each filtered one is cached under a key made from its SQL.
+    """
+    if not queryset.query.where:
+        return feed_paginator(queryset, per_page,
+                              count=estimated_count(queryset), **kwargs)
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(repr((sql, params)).encode()).hexdigest()
+    return feed_paginator(queryset, per_page,
+                          count_key=f'admin_count:{digest}', **kwargs)
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(Sequence):
+    """One page of a ``CursorPaginator``.
+
+    Mimics the parts of ``django.core.paginator.Page`` used by the
+    templates; ``number`` is ``None`` because a cursor page has no number.
+    """
+    number = None
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of %s items>' % len(self)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class _Row:
+    """Attribute access to a ``.values()`` row for ``value_to_string``."""
+
+    def __init__(self, row):
+        self.__dict__.update(row)
+
+
+class CursorPaginator:
+    """Paginate a queryset by seeking on a unique ordering.
+
+    ``ordering`` must end with a unique field so that every row has a
+    distinct position. The queryset may also be a ``.values()`` one that
+    selects those fields. ``seek_on`` spells the same ordering as lookups
+    into a joined table that holds the same values, e.g. an inbox whose
+    index the query should follow; the cursors still carry the values of
+    ``ordering``'s own fields.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 seek_on=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        opts = object_list.model._meta
+        self._fields = [opts.get_field(name.lstrip('-'))
+                        for name in ordering]
+        self.ordering = tuple(seek_on or ordering)
+
+    def encode_cursor(self, obj, direction=NEXT):
+        if isinstance(obj, dict):
+            obj = _Row(obj)
+        values = [field.value_to_string(obj) for field in self._fields]
+        payload = json.dumps([direction] + values).encode()
+        return urlsafe_base64_encode(payload)
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, *values = json.loads(urlsafe_base64_decode(cursor))
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(values) != len(self._fields):
+                raise ValueError(values)
+            values = [field.to_python(value)
+                      for field, value in zip(self._fields, values)]
+        except Exception:
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _seek(self, values, direction):
+        """Build ``(a, b) < (x, y)`` as ``a < x OR (a = x AND b < y)``."""
+        conditions = []
+        for i, (name, value) in enumerate(zip(self.ordering, values)):
+            descending = name.startswith('-')
+            # Идём "вперёд" по убыванию - значит, ищем меньшие значения
+            lookup = 'lt' if descending == (direction == NEXT) else 'gt'
+            condition = Q(**{'%s__%s' % (name.lstrip('-'), lookup): value})
+            for prev_name, prev_value in zip(self.ordering[:i], values[:i]):
+                condition &= Q(**{prev_name.lstrip('-'): prev_value})
+            conditions.append(condition)
+        return reduce(lambda a, b: a | b, conditions)
+
+    def _reversed_ordering(self):
+        return tuple(name[1:] if name.startswith('-') else '-' + name
+                     for name in self.ordering)
+
+    def page(self, cursor=None):
+        """Return the page after (or before) ``cursor``; the first page
+        when ``cursor`` is empty."""
+        direction, values = NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+
+        if direction == NEXT:
+            queryset = self.object_list.order_by(*self.ordering)
+        else:
+            queryset = self.object_list.order_by(*self._reversed_ordering())
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, direction))
+
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+
+        if direction == PREVIOUS:
+            if not items:
+                # Все более новые записи удалены - это первая страница
+                return self.page()
+            items.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = values is not None, has_more
+
+        next_cursor = previous_cursor = None
+        if has_next and items:
+            next_cursor = self.encode_cursor(items[-1], NEXT)
+        if has_previous:
+            # Пустая страница за концом ленты ведёт обратно на первую
+            previous_cursor = (self.encode_cursor(items[0], PREVIOUS)
+                               if items else '')
+        return CursorPage(items, self, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        """Like ``page()``, but fall back to the first page on a broken
+        cursor instead of raising."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
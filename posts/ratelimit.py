@@ -0,0 +1,94 @@
+"""Token-bucket limits for the views that write to the database.
+
+Each URL name in ``RATELIMITS`` gets a bucket per client IP and one per
+logged-in user, e.g. ``{'user': '10/m', 'ip': '30/m'}``: a bucket holds
+up to 10 tokens, refills at 10 per minute and every request takes one.
+A request takes its tokens only if all of its buckets have one, so a
+request rejected by the user bucket does not use up the IP bucket.
+
+``@ratelimit`` is meant to be the outermost decorator of a view: the IP
+bucket is checked before the session is read, so a request rejected by
+it makes no database queries. The user bucket takes the user id from the
+session without loading the user; with the ``db`` session engine that
+costs the one query that reads the session, and a rejected request never
+reaches ``login_required``, the form or the rest of the database.
+
+Buckets live in the default cache and are read and written without a
+lock, so concurrent requests may slip a token or two past the limit. With
+``LocMemCache`` every process has its own buckets.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """``'10/m'`` -> ``(10, 60)``: bucket size and refill period."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def take_tokens(buckets):
+    """Take a token from each of ``buckets`` (``(key, rate)`` pairs), but
+    only if every one of them has a token. Returns 0 on success or the
+    number of seconds until the first empty bucket has a token. The
+    buckets after an empty one are not looked at."""
+    now = time.time()
+    levels = []
+    for key, rate in buckets:
+        capacity, period = parse_rate(rate)
+        refill = capacity / period
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            return (1 - tokens) / refill
+        levels.append((key, tokens, period))
+    for key, tokens, period in levels:
+        # За period пустое ведро наполнится целиком - дольше хранить незачем
+        cache.set(key, (tokens - 1, now), period)
+    return 0
+
+
+def client_ip(request):
+    return request.META.get(settings.RATELIMIT_IP_HEADER, '')
+
+
+def _buckets(request, name, limits):
+    if limits.get('ip'):
+        yield f'ratelimit:{name}:ip:{client_ip(request)}', limits['ip']
+    if limits.get('user'):
+        user_id = request.session.get(SESSION_KEY)
+        if user_id is not None:
+            yield f'ratelimit:{name}:user:{user_id}', limits['user']
+
+
+def too_many_requests(retry_after):
+    response = HttpResponse('Слишком много запросов, попробуйте позже',
+                            status=429, content_type='text/plain')
+    response['Retry-After'] = math.ceil(retry_after)
+    return response
+
+
+def ratelimit(view=None, methods=None):
+    """Limit the requests to ``view`` by ``RATELIMITS[<URL name>]``;
+    only ``methods`` are counted if given."""
+    if view is None:
+        return lambda view: ratelimit(view, methods)
+
+    @wraps(view)
+    def limited(request, *args, **kwargs):
+        name = request.resolver_match.view_name
+        limits = settings.RATELIMITS.get(name)
+        if limits and (methods is None or request.method in methods):
+            retry_after = take_tokens(_buckets(request, name, limits))
+            if retry_after:
+                return too_many_requests(retry_after)
+        return view(request, *args, **kwargs)
+    return limited
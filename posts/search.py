@@ -0,0 +1,79 @@
+"""Full-text search over posts.
+
+On SQLite the posts are indexed in the FTS5 table ``posts_post_fts``
+(rowid = post id) with the post text, the author's username and the
+group title. Triggers on ``posts_post``, the users table and
+``posts_group`` keep it in sync with every write, including ``update()``
+and raw SQL, so the application code never touches it. The table and the
+triggers are created by migration ``0018_post_search``.
+
+``search_post_ids`` takes the ``SEARCH_MAX_CANDIDATES`` newest matches
+straight from the index and returns the ``SEARCH_MAX_RESULTS`` best of
+them by bm25 boosted for recency: a post published today scores
+``1 + SEARCH_RECENCY_WEIGHT`` times its bm25, one ``SEARCH_RECENCY_DAYS``
+old half the boost. ``filter_by_text`` matches the text column only and
+returns every match, for the admin. Other databases fall back to
+``icontains`` on the text, newest first.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+# Не больше стольких слов запроса уходит в MATCH
+MAX_TERMS = 10
+# Слова короче ищутся целиком: префикс из одной-двух букв совпадает почти
+# со всеми записями (индекс префиксов - prefix = '3' в миграции 0018)
+MIN_PREFIX = 3
+
+
+def match_expression(query):
+    """FTS5 query for the words of ``query``: all of them, words of
+    ``MIN_PREFIX`` letters or more also as a prefix. Quoting keeps FTS5
+    operators in the input from being parsed."""
+    words = re.findall(r'\w+', query)[:MAX_TERMS]
+    return ' '.join(f'"{word}"*' if len(word) >= MIN_PREFIX else f'"{word}"'
+                    for word in words)
+
+
+def search_post_ids(query, limit=None):
+    """Ids of the posts matching ``query``, best first."""
+    limit = limit or settings.SEARCH_MAX_RESULTS
+    expression = match_expression(query)
+    if not expression:
+        return []
+    if connection.vendor != 'sqlite':
+        return list(Post.objects.filter(text__icontains=query)
+                    .values_list('id', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        # bm25 считается только для SEARCH_MAX_CANDIDATES самых новых
+        # совпадений: FTS5 отдаёт их по rowid, не ранжируя остальные
+        cursor.execute(
+            f"SELECT m.rowid FROM (SELECT rowid, rank FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s) m "
+            f"JOIN posts_post p ON p.id = m.rowid "
+            f"ORDER BY m.rank * (1 + %s / (1 + (julianday('now') "
+            f"- julianday(p.pub_date)) / %s)), p.id DESC LIMIT %s",
+            [expression, settings.SEARCH_MAX_CANDIDATES,
+             settings.SEARCH_RECENCY_WEIGHT, settings.SEARCH_RECENCY_DAYS,
+             limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_by_text(queryset, query):
+    """``queryset`` narrowed to the posts whose text matches ``query``,
+    all of them and in the queryset's own order."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if connection.vendor != 'sqlite':
+        return queryset.filter(text__icontains=query)
+    # pk__in=RawSQL(...) взял бы подзапрос в лишние скобки, и SQLite
+    # сравнил бы id только с первой строкой
+    return queryset.extra(
+        where=[f'{Post._meta.db_table}.id IN (SELECT rowid FROM {TABLE} '
+               f'WHERE {TABLE} MATCH %s)'],
+        params=[f'text : ({expression})'])
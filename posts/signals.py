@@ -0,0 +1,95 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import timeline
+from .cache import (bump, followers_scope, following_scope, forget_count,
+                    group_scope, post_scopes)
+from .counters import change
+from .models import Comment, Follow, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw=False, **kwargs):
+    # При переносе записи в другое сообщество сбросить нужно и старое
+    if instance.pk and not raw:
+        instance._saved_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', flat=True).first())
+
+
+@receiver(pre_save, sender=Post)
+def decide_fan_out(sender, instance, raw=False, **kwargs):
+    # Решение принимается один раз, при публикации, и хранится в записи
+    if instance.pk is None and not raw:
+        instance.fanned_out = not timeline.is_popular(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        change(UserStats, instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+    bump(*post_scopes(instance.author_id, instance.group_id))
+    saved_group_id = getattr(instance, '_saved_group_id', None)
+    if saved_group_id and saved_group_id != instance.group_id:
+        bump(group_scope(saved_group_id))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change(UserStats, instance.author_id, 'posts_count', -1)
+    bump(*post_scopes(instance.author_id, instance.group_id))
+
+
+def bump_comment_post(comment):
+    """Invalidate the feeds showing the comment counter of the post."""
+    try:
+        post = comment.post
+    except Post.DoesNotExist:
+        return
+    bump(*post_scopes(post.author_id, post.group_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change(Post, instance.post_id, 'comment_count', 1,
+               updated_at=timezone.now())
+        bump_comment_post(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change(Post, instance.post_id, 'comment_count', -1,
+           updated_at=timezone.now())
+    bump_comment_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change(UserStats, instance.author_id, 'followers_count', 1)
+        change(UserStats, instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        bump(following_scope(instance.user_id),
+             followers_scope(instance.author_id))
+        forget_count(following_scope(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change(UserStats, instance.author_id, 'followers_count', -1)
+    change(UserStats, instance.user_id, 'following_count', -1)
+    timeline.unfill(instance.user_id, instance.author_id)
+    bump(following_scope(instance.user_id),
+         followers_scope(instance.author_id))
+    forget_count(following_scope(instance.user_id))
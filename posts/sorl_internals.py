@@ -0,0 +1,90 @@
+"""The non-public parts of sorl-thumbnail that ``posts.thumbnails`` uses.
+
+``get_thumbnail`` asks the key-value store about every image and size in
+turn. To look up a whole feed at once, thumbnail names are computed the
+way sorl's ``ThumbnailBackend`` does and the records are read from its
+store in bulk. Neither is a public sorl API, so they are used only with
+the sorl versions in ``CHECKED_VERSIONS``; with any other version
+``SUPPORTED`` is false, the functions here return ``None`` and the
+callers fall back to ``get_thumbnail`` and ``kvstore.get``.
+"""
+import sorl
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as DbKVStore
+from sorl.thumbnail.models import KVStore as KVStoreRecord
+
+# Версии sorl, с которыми проверено всё, что ниже
+CHECKED_VERSIONS = ('12.5.', '12.6.', '12.7.')
+
+SUPPORTED = (
+    getattr(sorl, '__version__', '').startswith(CHECKED_VERSIONS)
+    and all(hasattr(ThumbnailBackend, name) for name in (
+        '_get_format', '_get_thumbnail_filename', 'default_options',
+        'extra_options'))
+)
+
+
+def thumbnail_file(source, geometry, options):
+    """The thumbnail ``get_thumbnail`` would return, computed without any
+    lookups; mirrors the option handling of sorl's ``ThumbnailBackend``."""
+    if not SUPPORTED:
+        return None
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def cached_thumbnails(thumbnails):
+    """``{thumbnail: stored ImageFile}`` for the ``thumbnails`` found in
+    the cache of the database key-value store, with one ``get_many``;
+    ``None`` if the store is not read this way."""
+    if not SUPPORTED or not isinstance(default.kvstore, DbKVStore):
+        return None
+    keys = {add_prefix(thumbnail.key): thumbnail for thumbnail in thumbnails}
+    found = default.kvstore.cache.get_many(keys)
+    # Закэшированный промах sorl хранит не строкой
+    return {keys[key]: deserialize_image_file(value)
+            for key, value in found.items() if isinstance(value, str)}
+
+
+def stored_thumbnails(thumbnails):
+    """``{thumbnail: stored ImageFile}`` for the ``thumbnails`` that have a
+    record in the database key-value store, with one query; the records
+    are put in the store's cache as ``kvstore.get`` would. ``None`` if the
+    store is not read this way."""
+    if not SUPPORTED or not isinstance(default.kvstore, DbKVStore):
+        return None
+    keys = {add_prefix(thumbnail.key): thumbnail for thumbnail in thumbnails}
+    found = dict(KVStoreRecord.objects.filter(
+        key__in=keys).values_list('key', 'value'))
+    default.kvstore.cache.set_many(found,
+                                   sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+    return {keys[key]: deserialize_image_file(value)
+            for key, value in found.items()}
+
+
+def stored_names(thumbnails):
+    """Names of the ``thumbnails`` that have a record in the database
+    key-value store, with one query; ``None`` if the store is not read
+    this way."""
+    if not SUPPORTED or not isinstance(default.kvstore, DbKVStore):
+        return None
+    keys = {add_prefix(thumbnail.key): thumbnail.name
+            for thumbnail in thumbnails}
+    found = KVStoreRecord.objects.filter(
+        key__in=keys).values_list('key', flat=True)
+    return {keys[key] for key in found}
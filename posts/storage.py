@@ -0,0 +1,45 @@
+"""Content-addressed storage for uploaded post images.
+
+``ContentAddressedStorage`` names every file after the SHA-256 of its
+content, e.g. ``posts/3f/3fa1...c9.jpg``. The same photo uploaded twice
+is stored once, and the file behind a URL never changes, so the URL can
+be cached as immutable.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def hashed_name(self, name, content):
+        """``<dir>/<first two hex digits>/<sha256>.<ext>`` for ``content``
+        saved under ``name``."""
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Такой файл уже есть - второй раз его не сохраняем, но
+            # обновляем mtime, чтобы sweep_media не счёл его старым мусором
+            os.utime(self.path(name))
+        else:
+            name = self._save(name, content)
+        return name.replace('\\', '/')
+
+
+post_images = ContentAddressedStorage()
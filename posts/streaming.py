@@ -0,0 +1,101 @@
+"""Streaming rendering of the feed pages.
+
+``render`` builds the whole page before the first byte is sent, so the
+browser cannot start loading the styles and scripts from ``<head>`` while
+the posts are being queried. ``stream_feed`` renders the page with a
+marker in place of the post list, sends everything before the marker at
+once and then the post cards in chunks of ``STREAMING_FEED_CHUNK`` as
+``.iterator()`` reads them from the database.
+
+Once the first chunk is sent the status can no longer change, so an error
+in the middle of the list cuts the page short instead of showing a 500.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+
+from .paginator import NEXT, PREVIOUS
+from .templatetags.feed_tags import render_posts
+
+# Его выводит posts/post_list.html вместо карточек, если страница потоковая
+STREAM_MARKER = '<!-- stream-posts -->'
+# Курсоры соседних страниц известны, только когда записи уже прочитаны:
+# ссылки паджинатора получают их на место этих меток
+NEXT_SLOT = 'stream-next-cursor'
+PREVIOUS_SLOT = 'stream-previous-cursor'
+
+
+def _rows(object_list):
+    # Страница Paginator - ещё не выполненный срез queryset'а,
+    # а CursorPaginator уже прочитал свои записи в список
+    if isinstance(object_list, QuerySet):
+        return object_list.iterator(chunk_size=settings.STREAMING_FEED_CHUNK)
+    return iter(object_list)
+
+
+def _chunks(rows, size):
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _slot_cursors(page):
+    # Страница по номеру (add_cursors) строит курсоры из своих записей -
+    # до отдачи шапки их читать нельзя
+    if getattr(page, 'cursor_paginator', None) is None:
+        return
+    page.next_cursor = lambda: NEXT_SLOT if page.has_next() else None
+    page.previous_cursor = (
+        lambda: PREVIOUS_SLOT if page.has_previous() else None)
+
+
+def _fill_cursors(tail, page, first, last):
+    cursors = getattr(page, 'cursor_paginator', None)
+    if cursors is None:
+        return tail
+    # Пустая страница ведёт на первую (?cursor=)
+    next_cursor = cursors.encode_cursor(last, NEXT) if last else ''
+    previous_cursor = (cursors.encode_cursor(first, PREVIOUS)
+                       if first else '')
+    return (tail.replace(NEXT_SLOT, next_cursor)
+            .replace(PREVIOUS_SLOT, previous_cursor))
+
+
+def _content(head, tail, page, context):
+    yield head
+    first = last = None
+    for chunk in _chunks(_rows(page.object_list),
+                         settings.STREAMING_FEED_CHUNK):
+        first = first or chunk[0]
+        last = chunk[-1]
+        yield render_posts(context, chunk)
+    yield _fill_cursors(tail, page, first, last)
+
+
+def stream_feed(request, template_name, context):
+    """Response with the feed page ``template_name`` streamed to the
+    client; ``context['page']`` is the page of posts."""
+    _slot_cursors(context['page'])
+    html = render_to_string(template_name, {**context, 'streaming': True},
+                            request)
+    if STREAM_MARKER not in html:
+        return StreamingHttpResponse([html])
+    head, tail = html.split(STREAM_MARKER, 1)
+    response = StreamingHttpResponse(
+        _content(head, tail, context['page'], {'user': request.user}))
+    # Иначе nginx накопит ответ в буфере и отдаст его целиком
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def render_feed(request, template_name, context):
+    """``render`` or, with ``STREAMING_FEEDS`` on, ``stream_feed``."""
+    if settings.STREAMING_FEEDS:
+        return stream_feed(request, template_name, context)
+    return render(request, template_name, context)
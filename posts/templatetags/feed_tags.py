@@ -0,0 +1,170 @@
+import re
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from posts.cache import generation_timeout
+from posts.models import Post
+from posts.paginator import CURSOR_PARAM
+from posts.thumbnails import (card_size, card_variants,
+                              logger as thumbnail_logger)
+
+register = template.Library()
+
+POST_TEMPLATE = 'posts/post_item.html'
+# Метка в карточке, на место которой встаёт ссылка автора (post_actions)
+ACTIONS_MARKER = re.compile(r'<!-- post-actions (\d+) (\S+) (\d+) -->')
+# Карточка занимает всю ширину колонки, но не шире 960px
+CARD_SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+@register.filter
+def page_window(page, on_each_side=2):
+    """Page numbers to link from ``page``: the first and the last page and
+    ``on_each_side`` pages around the current one. ``None`` marks a gap.
+    Pages past ``FEED_MAX_PAGE`` are reached by cursor only."""
+    last = min(page.paginator.num_pages, settings.FEED_MAX_PAGE)
+    numbers = {1, last}
+    numbers.update(range(max(1, page.number - on_each_side),
+                         min(last, page.number + on_each_side) + 1))
+    window = []
+    previous = 0
+    for number in sorted(numbers):
+        if number - previous > 1:
+            window.append(None)
+        window.append(number)
+        previous = number
+    return window
+
+
+@register.simple_tag(takes_context=True)
+def page_url(context, **params):
+    """Query string of the current page with ``params`` in place of its
+    page number or cursor, so that links keep the other parameters
+    (e.g. the search query ``q``)."""
+    query = context['request'].GET.copy()
+    for name in ('page', CURSOR_PARAM):
+        query.pop(name, None)
+    for name, value in params.items():
+        query[name] = value
+    return '?' + query.urlencode()
+
+
+@register.simple_tag
+def card_image(image, variants=None):
+    """``<img>`` of a post card with a ``srcset`` of ``CARD_WIDTHS``
+    variants, so that the browser downloads the narrowest one that fits.
+
+    ``variants`` are the image's thumbnails from ``card_variants`` if the
+    caller has already fetched them. The size comes from the post's
+    ``image_width`` and ``image_height``; without them the ``<img>`` has
+    no ``width`` and ``height``.
+    """
+    if not image:
+        return ''
+    if variants is None:
+        try:
+            variants = card_variants([image.name]).get(image.name)
+        except Exception:
+            thumbnail_logger.exception('Cannot get thumbnails for %s', image)
+    if not variants:
+        return ''
+    post = image.instance
+    if not (post.image_width and post.image_height):
+        srcset = ', '.join('%s %dw' % (thumbnail.url, width)
+                           for width, thumbnail in variants)
+        return format_html(
+            '<img class="card-img" src="{}" srcset="{}" sizes="{}" />',
+            variants[-1][1].url, srcset, CARD_SIZES)
+
+    # Картинка не растягивается: варианты шире оригинала совпадают с ним
+    sizes = {}
+    for width, thumbnail in variants:
+        size = card_size(width, post.image_width, post.image_height)
+        sizes.setdefault(size, thumbnail)
+    srcset = ', '.join('%s %dw' % (thumbnail.url, width)
+                       for (width, height), thumbnail in sizes.items())
+    (width, height), largest = list(sizes.items())[-1]
+    return format_html(
+        '<img class="card-img" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}" />',
+        largest.url, srcset, CARD_SIZES, width, height)
+
+
+def post_fragment_key(post, link_to_post):
+    return 'post_card:{}:{}:{:d}'.format(
+        post.pk, post.updated_at.timestamp(), link_to_post)
+
+
+def post_actions(user, author_id, username, post_id):
+    """The viewer-dependent part of a post card: the author's edit link."""
+    if user is None or user.pk != author_id:
+        return ''
+    return format_html(
+        '<a class="btn btn-sm btn-info" href="{}" role="button">'
+        'Редактировать</a>',
+        reverse('posts:post_edit', args=[username, post_id]),
+    )
+
+
+@register.filter
+def with_post_actions(html, user):
+    """``html`` with the action markers of its cards filled for ``user``;
+    for cards cached together with the page around them."""
+    return mark_safe(ACTIONS_MARKER.sub(
+        lambda match: post_actions(user, int(match[1]), match[2],
+                                   int(match[3])),
+        html))
+
+
+@register.simple_tag
+def feed_cache_timeout():
+    """Timeout of the ``feed_page`` fragment (see ``generation_timeout``)."""
+    return generation_timeout(settings.FEED_FRAGMENT_CACHE_TIMEOUT)
+
+
+@register.simple_tag(takes_context=True)
+def render_posts(context, posts, link_to_post=True, actions=True):
+    """Render the cards of ``posts`` (a post or an iterable of posts).
+
+    Cards are cached per post and ``updated_at``, so a warm feed page is a
+    single ``get_many`` and string joins; only the cards missing from the
+    cache render ``posts/post_item.html``, with the thumbnails of all of
+    them fetched in one go. With ``actions=False`` the cards keep their
+    action markers for ``with_post_actions``.
+    """
+    if isinstance(posts, Post):
+        posts = [posts]
+    keyed = {post_fragment_key(post, link_to_post): post for post in posts}
+    fragments = cache.get_many(keyed)
+
+    stale = [(key, post) for key, post in keyed.items()
+             if key not in fragments]
+    # Миниатюры всех перерисовываемых карточек - одним запросом
+    variants = {}
+    try:
+        variants = card_variants(post.image.name for key, post in stale
+                                 if post.image)
+    except Exception:
+        thumbnail_logger.exception('Cannot get thumbnails for the feed')
+    missing = {
+        key: render_to_string(POST_TEMPLATE, {
+            'post': post,
+            'link_to_post': link_to_post,
+            'card_variants': variants.get(post.image.name),
+        })
+        for key, post in stale
+    }
+    if missing:
+        cache.set_many(missing, settings.POST_FRAGMENT_CACHE_TIMEOUT)
+        fragments.update(missing)
+
+    html = ''.join(fragments[key] for key in keyed)
+    if not actions:
+        return mark_safe(html)
+    return with_post_actions(html, context.get('user'))
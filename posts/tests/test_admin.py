@@ -0,0 +1,115 @@
+import json
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+@override_settings(ADMIN_BATCH_SIZE=2)
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser('admin_user', 'a@a.ru',
+                                                  'x')
+        cls.author = User.objects.create(username='admin_author')
+        cls.group = Group.objects.create(title='admin', slug='admin',
+                                         description='admin')
+        for i in range(5):
+            post = Post.objects.create(text=f'admin post {i}',
+                                       author=cls.author)
+            Comment.objects.create(post=post, author=cls.author, text='c')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+        cache.clear()
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_changelists_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк, а COUNT(*)
+        берётся из кэша."""
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                url = reverse(f'admin:posts_{model}_changelist')
+                self.changelist_queries(url)
+                first = self.changelist_queries(url)
+                post = Post.objects.create(text='one more',
+                                           author=self.author)
+                Comment.objects.create(post=post, author=self.admin,
+                                       text='c')
+                Follow.objects.create(
+                    user=User.objects.create(username=f'{model}_reader'),
+                    author=self.author)
+                second = self.changelist_queries(url)
+                self.assertEqual(len(second), len(first))
+                self.assertFalse(any('COUNT(' in sql for sql in second))
+
+    def test_unfiltered_changelist_is_estimated(self):
+        """Полный список считается по наибольшему id, отфильтрованный -
+        точно."""
+        url = reverse('admin:posts_post_changelist')
+        queries = self.changelist_queries(url)
+        self.assertTrue(any('MAX(' in sql for sql in queries))
+        self.assertFalse(any('COUNT(' in sql for sql in queries))
+        queries = self.changelist_queries(url + '?q=admin')
+        self.assertTrue(any('COUNT(' in sql for sql in queries))
+
+    def post_action(self, action, **data):
+        return self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': action,
+            '_selected_action': list(
+                Post.objects.values_list('pk', flat=True)),
+            **data,
+        })
+
+    def test_move_to_group(self):
+        """Записи переносятся пачками, лента сообщества обновляется."""
+        group_url = reverse('posts:group', args=['admin'])
+        self.assertNotContains(self.client.get(group_url), 'admin post')
+        self.post_action('move_to_group', group=self.group.pk)
+        self.assertEqual(self.group.posts.count(), 5)
+        self.assertContains(self.client.get(group_url), 'admin post', 5)
+
+        self.post_action('move_to_group', group='')
+        self.assertEqual(self.group.posts.count(), 0)
+
+    def test_delete_in_batches(self):
+        """Пачечное удаление спрашивает подтверждение с числом строк и
+        обновляет счётчики через сигналы."""
+        response = self.post_action('delete_in_batches')
+        self.assertContains(response, 'Будет удалено: 5')
+        self.assertEqual(Post.objects.count(), 5)
+        self.post_action('delete_in_batches', post='yes')
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(UserStats.for_user(self.author).posts_count, 0)
+
+    def test_author_autocomplete_by_prefix(self):
+        """Автодополнение автора ищет по началу имени."""
+        response = self.client.get(reverse('admin:auth_user_autocomplete'),
+                                   {'term': 'admin_a'})
+        results = json.loads(response.content)['results']
+        self.assertEqual([result['text'] for result in results],
+                         ['admin_author'])
+
+    def test_delete_all_across_pages(self):
+        """Подтверждение сохраняет выбор всех строк по фильтру."""
+        data = {'action': 'delete_in_batches', 'select_across': '1',
+                '_selected_action': [Post.objects.first().pk]}
+        url = reverse('admin:posts_comment_changelist')
+        response = self.client.post(url, data)
+        self.assertContains(response, 'Будет удалено: 5')
+        self.assertContains(response, 'name="select_across" value="1"')
+        self.client.post(url, {**data, 'post': 'yes'})
+        self.assertFalse(Comment.objects.exists())
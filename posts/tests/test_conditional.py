@@ -0,0 +1,118 @@
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='etag_author')
+        cls.reader = User.objects.create(username='etag_reader')
+        cls.group = Group.objects.create(title='etag', slug='etag',
+                                         description='etag')
+        cls.post = Post.objects.create(text='etag', author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post', args=[self.author.username, self.post.id]),
+        )
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_page_is_not_rendered(self):
+        """Неизменившаяся страница - 304 без шаблонов: у записей ленты
+        читаются только id и updated_at (и группа или автор), у страницы
+        записи - она сама."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+                self.assertEqual(len(queries),
+                                 1 if url == self.urls()[0] else 2)
+                if url == self.urls()[-1]:
+                    continue
+                for query in queries:
+                    self.assertNotIn('"posts_post"."text"', query['sql'])
+                    self.assertNotIn('COUNT(', query['sql'])
+
+    def test_if_modified_since(self):
+        """Страницы отдают Last-Modified и отвечают 304 на
+        If-Modified-Since, пока записи не изменились."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                last_modified = self.guest_client.get(url)['Last-Modified']
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 304)
+                Post.objects.filter(pk=self.post.pk).update(
+                    updated_at=timezone.now() + timezone.timedelta(hours=1))
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 200)
+                Post.objects.filter(pk=self.post.pk).update(
+                    updated_at=self.post.updated_at)
+
+    def test_changes_invalidate_etag(self):
+        """Новый комментарий и подписка меняют ETag страниц."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                Comment.objects.create(post=self.post, author=self.reader,
+                                       text='new')
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+        url = reverse('posts:profile', args=[self.author.username])
+        etag = self.guest_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        """Гость и авторизованный пользователь видят разные страницы."""
+        url = reverse('posts:index')
+        guest_etag = self.guest_client.get(url)['ETag']
+        response = self.authorized_client.get(url,
+                                              HTTP_IF_NONE_MATCH=guest_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.revalidate(self.authorized_client,
+                                         url).status_code, 304)
+
+    def test_etag_comes_from_database(self):
+        """ETag не зависит от кэша процесса, но видит изменения в БД,
+        сделанные в обход сигналов."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                cache.clear()
+                self.assertEqual(self.guest_client.get(url)['ETag'], etag)
+                Post.objects.filter(pk=self.post.pk).update(
+                    text='changed', updated_at=timezone.now())
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
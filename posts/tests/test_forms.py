@@ -1,12 +1,17 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from posts.models import Post, Group
 from django.urls import reverse
 import tempfile
 from django.conf import settings
+import os
 import shutil
+from io import BytesIO
+from unittest import mock
+from PIL import Image
 from django.core.files.uploadedfile import SimpleUploadedFile
 from posts.forms import PostForm
+from posts.images import process_upload
 from django.core.cache import cache
 
 User = get_user_model()
@@ -125,3 +130,83 @@ class PostCreateTest(TestCase):
                              errors=['Upload a valid image. The file you'
                                      ' uploaded was either not an image or'
                                      ' a corrupted image.'])
+
+
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.author = User.objects.create(username='uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        cache.clear()
+
+    @staticmethod
+    def make_image(size, format='PNG', **params):
+        buffer = BytesIO()
+        Image.effect_noise(size, 64).convert('RGB').save(buffer, format,
+                                                         **params)
+        return SimpleUploadedFile(f'photo.{format.lower()}',
+                                  buffer.getvalue())
+
+    def post_image(self, image):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            return self.authorized_client.post(
+                reverse('posts:new_post'),
+                data={'text': 'upload', 'image': image})
+
+    @override_settings(UPLOAD_MAX_BYTES=2 ** 10)
+    def test_too_large_file(self):
+        """Файл больше лимита отклоняется, пост не создаётся."""
+        response = self.post_image(self.make_image((100, 100)))
+        self.assertFormError(response, 'form', 'image',
+                             'Файл больше 1.0\xa0KB.')
+        self.assertFalse(Post.objects.filter(text='upload').exists())
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels(self):
+        """Картинка с большим числом пикселей отклоняется."""
+        response = self.post_image(self.make_image((20, 20)))
+        self.assertFormError(response, 'form', 'image',
+                             'Слишком большое изображение: 20×20.')
+
+    @override_settings(IMAGE_MAX_SIDE=64)
+    def test_image_is_reencoded(self):
+        """Картинка уменьшается, поворачивается по EXIF и теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90°
+        self.post_image(self.make_image((200, 100), 'JPEG', exif=exif))
+        post = Post.objects.get(text='upload')
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertEqual((post.image_width, post.image_height), (32, 64))
+        with override_settings(MEDIA_ROOT=self.media_root):
+            with Image.open(post.image.path) as image:
+                self.assertEqual(image.size, (32, 64))
+                self.assertNotIn('exif', image.info)
+
+    def test_reencoded_file_is_closed(self):
+        """Временный файл перекодированной картинки закрывается, и когда
+        такая картинка уже сохранена."""
+        processed = []
+
+        def track(upload):
+            processed.append(process_upload(upload))
+            return processed[-1]
+
+        image = self.make_image((20, 20))
+        with mock.patch('posts.forms.process_upload', track):
+            for _ in range(2):
+                image.seek(0)
+                self.post_image(image)
+        self.assertEqual(len(processed), 2)
+        for file in processed:
+            self.assertTrue(file.file.closed)
+            self.assertFalse(os.path.exists(file.temporary_file_path()))
@@ -0,0 +1,108 @@
+import tempfile
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.urls import reverse
+from posts.cache import generation_timeout
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class PostFragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='fragment_author')
+        cls.reader = User.objects.create(username='fragment_reader')
+        cls.post = Post.objects.create(text='fragment', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, user=None):
+        template = Template('{% load feed_tags %}{% render_posts posts %}')
+        return template.render(Context({
+            'posts': Post.objects.all(),
+            'user': user,
+        }))
+
+    def test_warm_cards_are_not_rendered_again(self):
+        """Карточки из кэша не отрисовываются шаблоном повторно."""
+        self.render()
+        with self.assertTemplateNotUsed('posts/post_item.html'):
+            html = self.render()
+        self.assertIn('fragment', html)
+
+    def test_comment_changes_updated_at(self):
+        """Новый комментарий меняет updated_at и обновляет карточку."""
+        self.render()
+        updated_at = self.post.updated_at
+        Comment.objects.create(post=self.post, author=self.reader, text='c')
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated_at, updated_at)
+        with self.assertTemplateUsed('posts/post_item.html'):
+            html = self.render()
+        self.assertIn('Комментариев: 1', html)
+
+    def test_edit_link_only_for_author(self):
+        """Кнопка редактирования подставляется только автору."""
+        edit_url = reverse('posts:post_edit',
+                           args=[self.author.username, self.post.id])
+        self.assertIn(edit_url, self.render(self.author))
+        self.assertNotIn(edit_url, self.render(self.reader))
+        self.assertNotIn(edit_url, self.render())
+
+    def test_post_page_has_no_comment_button(self):
+        """На странице поста нет кнопки перехода к комментариям."""
+        post_url = reverse('posts:post',
+                           args=[self.author.username, self.post.id])
+        response = Client().get(post_url)
+        self.assertNotContains(response, f'href="{post_url}"')
+        self.assertContains(Client().get(reverse('posts:index')),
+                            f'href="{post_url}"')
+
+
+class FeedFragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='page_author')
+        cls.reader = User.objects.create(username='page_reader')
+        cls.post = Post.objects.create(text='shared', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_fragment_is_shared_between_readers(self):
+        """Фрагмент ленты один на всех, а ссылка автора - только автору."""
+        edit_url = reverse('posts:post_edit',
+                           args=[self.author.username, self.post.id])
+        author_client = Client()
+        author_client.force_login(self.author)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+
+        self.assertContains(author_client.get(reverse('posts:index')),
+                            edit_url)
+        with self.assertTemplateNotUsed('posts/post_item.html'):
+            response = reader_client.get(reverse('posts:index'))
+        self.assertContains(response, 'shared')
+        self.assertNotContains(response, edit_url)
+        self.assertNotContains(Client().get(reverse('posts:index')),
+                               edit_url)
+
+    def test_local_cache_keeps_fragments_briefly(self):
+        """С кэшем в памяти процесса фрагменты ленты живут недолго."""
+        with self.settings(LOCAL_GENERATION_TIMEOUT=20):
+            self.assertEqual(generation_timeout(86400), 20)
+        with tempfile.TemporaryDirectory() as location:
+            shared = {'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': location,
+            }}
+            with override_settings(CACHES=shared):
+                self.assertEqual(generation_timeout(86400), 86400)
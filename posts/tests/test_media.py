@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.test import TestCase, Client, override_settings
+from yatube.staticfiles import CompressedManifestStaticFilesStorage
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+DIGEST = 'ab' + '0' * 62
+STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SENDFILE=None)
+class MediaServingTest(TestCase):
+    url = '/media/posts/ab/photo.jpg'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(MEDIA_ROOT, 'posts', 'ab'))
+        for name in ('photo.jpg', DIGEST + '.jpg'):
+            with open(os.path.join(MEDIA_ROOT, 'posts', 'ab', name),
+                      'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_file_with_validators(self):
+        """Файл отдаётся целиком, с ETag; повтор - 304."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        # Имя без хэша: файл могут заменить, кэш перепроверяется
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        response = self.client.get(self.url,
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_hashed_file_is_immutable(self):
+        """Файл с хэшем содержимого в имени кэшируется навсегда."""
+        response = self.client.get(f'/media/posts/ab/{DIGEST}.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_byte_ranges(self):
+        """Поддерживаются запросы диапазонов байт."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-4:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+
+        # Файл изменился - вместо диапазона отдаётся весь файл
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19',
+                                   HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        """С nginx файл отдаёт прокси по X-Accel-Redirect."""
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/posts/ab/photo.jpg')
+        self.assertEqual(response.content, b'')
+
+    def test_missing_and_unsafe_paths(self):
+        """Несуществующие файлы, каталоги и выход из MEDIA_ROOT - 404."""
+        for url in ('/media/posts/ab/missing.jpg', '/media/posts/ab/',
+                    '/media/../manage.py', '/media/posts/.hidden'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(STATIC_ROOT=STATIC_ROOT)
+class StaticServingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        storage = CompressedManifestStaticFilesStorage(location=STATIC_ROOT)
+        storage.save('css/site.css',
+                     ContentFile(b'body { margin: 0; }\n' * 50))
+        storage.save('css/tiny.css', ContentFile(b'a {}'))
+        cls.processed = [
+            processed for original, processed, done in storage.post_process(
+                {name: (storage, name)
+                 for name in ('css/site.css', 'css/tiny.css')})
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_collectstatic_hashes_and_compresses(self):
+        """collectstatic пишет файлы с хэшем в имени и их .gz-копии."""
+        url = staticfiles_storage.url('css/site.css')
+        self.assertRegex(url, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+        self.assertIn(url[len('/static/'):] + '.gz', self.processed)
+        # Мелкие файлы не сжимаются
+        self.assertFalse(any(name.startswith('css/tiny.')
+                             and name.endswith('.gz')
+                             for name in self.processed))
+        # Файла нет в манифесте - ссылка без хэша, а не ошибка
+        self.assertEqual(staticfiles_storage.url('css/missing.css'),
+                         '/static/css/missing.css')
+
+    def test_precompressed_file_is_served(self):
+        """Клиенту, принимающему gzip, отдаётся сжатая копия навсегда."""
+        url = staticfiles_storage.url('css/site.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        # Файл без хэша в имени нужно перепроверять
+        response = self.client.get('/static/css/site.css')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from posts.media_sweep import MediaSweeper, walk
+from posts.models import Post
+from posts.sorl_internals import thumbnail_file
+from posts.thumbnails import THUMBNAIL_SIZES, _source
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+DAY = 24 * 60 * 60
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaSweeperTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='sweep_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        os.makedirs(MEDIA_ROOT)
+
+    def create_file(self, name, age=2 * DAY):
+        path = os.path.join(MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(b'data')
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_walk_resumes_after_cursor(self):
+        """Обход идёт в стабильном порядке и продолжается с курсора."""
+        for name in ('b/2', 'a/1', 'a/3', 'c'):
+            self.create_file(name)
+        self.assertEqual(list(walk(MEDIA_ROOT)), ['a/1', 'a/3', 'b/2', 'c'])
+        self.assertEqual(list(walk(MEDIA_ROOT, 'a/3')), ['b/2', 'c'])
+
+    def test_only_old_unreferenced_files_are_deleted(self):
+        """Удаляются только старые файлы, на которые нет ссылок."""
+        Post.objects.create(text='kept', author=self.author,
+                            image='posts/aa/used.jpg')
+        used = self.create_file('posts/aa/used.jpg')
+        orphan = self.create_file('posts/bb/orphan.jpg')
+        fresh = self.create_file('posts/cc/fresh.jpg', age=60)
+        geometry, options = THUMBNAIL_SIZES[0]
+        name = thumbnail_file(_source('posts/aa/used.jpg'), geometry,
+                              options).name
+        thumbnail = self.create_file(name)
+        # Так записывает миниатюру sorl
+        registered = ImageFile(name, default.storage)
+        registered.set_size((320, 113))
+        default.kvstore.set(registered)
+        stale_thumbnail = self.create_file('cache/00/11/stale.jpg')
+
+        out = StringIO()
+        call_command('sweep_media', pause=0, nice=0, stdout=out)
+
+        self.assertIn('Проверено файлов: 5. Удалено: 2', out.getvalue())
+        for path in (used, fresh, thumbnail):
+            self.assertTrue(os.path.exists(path), path)
+        for path in (orphan, stale_thumbnail):
+            self.assertFalse(os.path.exists(path), path)
+
+    def test_sweep_is_incremental(self):
+        """Каждый запуск проверяет не больше limit файлов и продолжает."""
+        for name in ('posts/aa/1.jpg', 'posts/aa/2.jpg', 'posts/bb/3.jpg'):
+            self.create_file(name)
+        sweeper = MediaSweeper(batch_size=1, pause=0, limit=2)
+        self.assertEqual(sweeper.sweep(), (2, 2))
+        self.assertTrue(os.path.exists(
+            os.path.join(MEDIA_ROOT, 'posts/bb/3.jpg')))
+        self.assertEqual(sweeper.sweep(), (1, 1))
+
+    def test_thumbnails_are_checked_by_batch(self):
+        """Миниатюры пачки проверяются одним запросом к хранилищу sorl."""
+        for index in range(3):
+            self.create_file(f'cache/00/11/{index}.jpg')
+        sweeper = MediaSweeper(batch_size=3, pause=0)
+        with self.assertNumQueries(1):
+            self.assertEqual(sweeper.sweep(), (3, 3))
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from posts.models import Post
+from yatube.metrics import CountingCache, RequestStats, _local, registry
+
+User = get_user_model()
+
+METRICS_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(METRICS_DIR=METRICS_DIR, METRICS_FLUSH_INTERVAL=0)
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='metrics_author')
+        Post.objects.create(text='metrics', author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.guest_client = Client()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        registry.views.clear()
+        registry.enabled = True
+        cache.clear()
+
+    def tearDown(self):
+        registry.enabled = False
+        registry.views.clear()
+
+    def metrics(self):
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        values = {}
+        for line in response.content.decode().splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                values[name] = float(value)
+        return values
+
+    def test_requests_are_recorded_by_view(self):
+        """Запросы учитываются по имени view: время, SQL, шаблоны, кэш."""
+        for _ in range(2):
+            self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get('/no/such/page/')
+        values = self.metrics()
+
+        view = '{view="posts:index"}'
+        self.assertEqual(
+            values['yatube_requests_total{view="posts:index",status="200"}'],
+            2)
+        self.assertEqual(
+            values['yatube_request_duration_seconds_count' + view], 2)
+        self.assertEqual(values['yatube_request_duration_seconds_bucket'
+                                '{view="posts:index",le="+Inf"}'], 2)
+        self.assertGreater(values['yatube_db_queries_total' + view], 0)
+        self.assertGreater(values['yatube_template_render_seconds_total'
+                                  + view], 0)
+        self.assertGreater(values['yatube_cache_hits_total' + view], 0)
+        self.assertGreater(values['yatube_cache_misses_total' + view], 0)
+        self.assertEqual(
+            values['yatube_requests_total{view="unresolved",status="404"}'],
+            1)
+
+    def test_processes_are_summed(self):
+        """/metrics складывает счётчики всех процессов."""
+        self.guest_client.get(reverse('posts:index'))
+        with open(os.path.join(METRICS_DIR, '%d.json' % os.getpid())) as f:
+            other = json.load(f)
+        with open(os.path.join(METRICS_DIR, '1.json'), 'w') as f:
+            json.dump(other, f)
+        values = self.metrics()
+        self.assertEqual(
+            values['yatube_requests_total{view="posts:index",status="200"}'],
+            2)
+
+    def test_streamed_pages_are_recorded(self):
+        """Потоковая страница учитывается после отдачи всех карточек."""
+        with self.settings(STREAMING_FEEDS=True):
+            response = self.guest_client.get(reverse('posts:index'))
+            self.assertNotIn('posts:index', registry.views)
+            b''.join(response.streaming_content)
+        self.assertGreater(registry.views['posts:index']['queries'], 0)
+
+    def test_only_served_requests_are_recorded(self):
+        """Запросы не через WSGI-приложение (команды, тесты) не
+        учитываются, а процесс без запросов не пишет файл."""
+        registry.enabled = False
+        self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(registry.views, {})
+        registry.flush()
+        self.assertFalse(os.path.exists(
+            os.path.join(METRICS_DIR, '%d.json' % os.getpid())))
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_are_not_public(self):
+        """/metrics отдаётся только разрешённым адресам."""
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+
+class CountingCacheTest(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+
+    def tearDown(self):
+        _local.stats = None
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_any_backend_is_counted(self):
+        """Попадания и промахи считаются для любого бэкенда кэша."""
+        counting = CountingCache(self.location, {
+            'COUNTED_BACKEND':
+                'django.core.cache.backends.filebased.FileBasedCache',
+        })
+        stats = _local.stats = RequestStats()
+        counting.set('present', 1)
+        self.assertEqual(counting.get('present'), 1)
+        self.assertIsNone(counting.get('absent'))
+        self.assertEqual(counting.get_many(['present', 'absent']),
+                         {'present': 1})
+        self.assertEqual(counting.incr('present'), 2)
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 2))
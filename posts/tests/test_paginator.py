@@ -0,0 +1,147 @@
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Post
+from posts.paginator import CursorPaginator, feed_page, feed_paginator
+from posts.templatetags.feed_tags import page_window
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='cursor_author')
+        Post.objects.bulk_create(
+            Post(text=f'post {i}', author=cls.author) for i in range(25))
+        # Половина записей с одинаковой датой - курсор различает их по id
+        same_date = timezone.now()
+        Post.objects.filter(id__lte=12).update(pub_date=same_date)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def walk(self, paginator):
+        page = paginator.page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_cursor_pages_match_offset_pages(self):
+        """Курсорные страницы совпадают с обычной паджинацией."""
+        expected = list(Post.objects.values_list('id', flat=True))
+        pages = self.walk(CursorPaginator(Post.objects.all(), 10))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([post.id for page in pages for post in page],
+                         expected)
+
+    def test_previous_cursor(self):
+        """Ссылка назад возвращает на предыдущую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first, second, _ = self.walk(paginator)
+        self.assertFalse(first.has_previous())
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_new_posts_do_not_shift_pages(self):
+        """Новые записи не сдвигают следующую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.page()
+        expected = list(paginator.page(first.next_cursor))
+        Post.objects.create(text='fresh post', author=self.author)
+        self.assertEqual(list(paginator.page(first.next_cursor)), expected)
+
+    def test_views_accept_cursor(self):
+        """Ленты принимают ?cursor= и рисуют ссылки на соседние страницы."""
+        response = self.client.get(reverse('posts:index'), {'cursor': ''})
+        page = response.context['page']
+        self.assertEqual(len(page), 10)
+        self.assertContains(response, f'?cursor={page.next_cursor}')
+
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username]),
+            {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['page']), 3)
+        self.assertTrue(response.context['page'].has_previous())
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('posts:index'),
+                                   {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page'].has_previous())
+
+
+class FeedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='counted_feed')
+        Post.objects.bulk_create(
+            Post(text=f'post {i}', author=cls.author) for i in range(30))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        """Число записей считается один раз и берётся из кэша."""
+        feed_paginator(Post.objects.all(), 10, count_key='test')
+        with CaptureQueriesContext(connection) as queries:
+            paginator = feed_paginator(Post.objects.all(), 10,
+                                       count_key='test')
+            self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual(len(queries), 0)
+        self.assertTrue(paginator.estimated)
+        # в контекст шаблона попадает обычный Paginator
+        self.assertIs(type(paginator), Paginator)
+
+    def test_stale_count_does_not_cut_page(self):
+        """Устаревший счётчик не обрезает содержимое страницы."""
+        paginator = feed_paginator(Post.objects.all(), 10, count=25)
+        self.assertEqual(len(feed_page(paginator, 3)), 10)
+
+    @override_settings(FEED_MAX_PAGE=50000)
+    def test_page_window(self):
+        """Выводятся только первая, последняя и соседние страницы."""
+        paginator = feed_paginator(Post.objects.all(), 1, count=50000)
+        self.assertEqual(page_window(feed_page(paginator, 1)),
+                         [1, 2, 3, None, 50000])
+        self.assertEqual(page_window(feed_page(paginator, 25000)),
+                         [1, None, 24998, 24999, 25000, 25001, 25002,
+                          None, 50000])
+        self.assertEqual(page_window(feed_page(paginator, 4)),
+                         [1, 2, 3, 4, 5, 6, None, 50000])
+
+    def test_index_renders_page_window(self):
+        response = Client().get(reverse('posts:index'), {'page': 2})
+        self.assertContains(response, '?page=3')
+        self.assertContains(response, 'Страниц: около 3')
+
+    def test_neighbours_are_linked_by_cursor(self):
+        """Страница по номеру ссылается на соседние курсором."""
+        response = Client().get(reverse('posts:index'), {'page': 2})
+        page = response.context['page']
+        self.assertContains(response, f'?cursor={page.next_cursor()}')
+        self.assertContains(response, f'?cursor={page.previous_cursor()}')
+        response = Client().get(reverse('posts:index'),
+                                {'cursor': page.next_cursor()})
+        self.assertEqual(list(response.context['page']),
+                         list(Post.objects.all()[20:30]))
+
+    @override_settings(FEED_MAX_PAGE=2)
+    def test_deep_page_numbers_are_capped(self):
+        """Номера страниц дальше FEED_MAX_PAGE не пропускают записи
+        через OFFSET и не выводятся в паджинаторе."""
+        response = Client().get(reverse('posts:index'), {'page': 3})
+        self.assertEqual(response.context['page'].number, 2)
+        self.assertNotContains(response, '?page=3')
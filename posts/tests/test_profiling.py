@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from posts.models import Post
+from yatube.profiling import profile_files
+
+User = get_user_model()
+
+PROFILING_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(PROFILING_DIR=PROFILING_DIR, PROFILING_SAMPLE_RATE=1,
+                   PROFILING_VIEWS=['posts:profile'])
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='profiled_author')
+        Post.objects.create(text='profiled', author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(PROFILING_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse('posts:profile', args=['profiled_author'])
+        shutil.rmtree(PROFILING_DIR, ignore_errors=True)
+
+    def test_only_selected_views_are_profiled(self):
+        """Профилируются только запросы к выбранным view."""
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(self.url)
+        self.assertEqual([view for view, path in profile_files()],
+                         ['posts:profile'])
+
+    @override_settings(PROFILING_MIN_DURATION=60)
+    def test_fast_requests_are_dropped(self):
+        """Профили быстрых запросов не сохраняются."""
+        self.guest_client.get(self.url)
+        self.assertEqual(profile_files(), [])
+
+    @override_settings(PROFILING_MAX_FILES=2)
+    def test_old_profiles_are_rotated(self):
+        """Хранится не больше PROFILING_MAX_FILES последних профилей."""
+        for _ in range(3):
+            self.guest_client.get(self.url)
+        files = profile_files()
+        self.assertEqual(len(files), 2)
+        self.assertEqual(sorted(os.listdir(PROFILING_DIR)),
+                         [os.path.basename(path) for view, path in files])
+
+    def test_report_merges_profiles(self):
+        """profile_report сводит профили view в один список функций."""
+        for _ in range(2):
+            self.guest_client.get(self.url)
+        out = StringIO()
+        call_command('profile_report', top=50, stdout=out)
+        report = out.getvalue()
+        self.assertIn('posts:profile: профилей 2', report)
+        self.assertIn('Ordered by: cumulative time', report)
+        self.assertIn('posts/views.py', report)
@@ -0,0 +1,150 @@
+import shutil
+import tempfile
+from contextlib import contextmanager
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from posts.management.commands.explain_views import plan_warnings
+from posts.models import FeedEntry, Follow, Group, Post
+from posts.storage import post_images
+from posts.thumbnails import generate
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@contextmanager
+def query_budget(test, budget, label=''):
+    """Fail ``test`` if the block runs more than ``budget`` SQL queries."""
+    with CaptureQueriesContext(connection) as queries:
+        yield
+    executed = len(queries)
+    if executed > budget:
+        statements = '\n'.join(query['sql'] for query in queries)
+        test.fail(f'{label}: {executed} queries, budget is {budget}\n'
+                  f'{statements}')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FeedQueryBudgetTest(TestCase):
+    """Число запросов ленты не зависит от количества записей."""
+    # Сессия и пользователь + запросы самой страницы (id и updated_at записей
+    # для ETag читаются отдельно от карточек) + миниатюры всех карточек
+    BUDGETS = {
+        'posts:index': 6,
+        'posts:group': 7,
+        'posts:profile': 7,
+        # + список авторов из подписок, пока он не попал в кэш
+        'posts:follow_index': 7,
+    }
+    SIZES = (10, 1_000, 100_000)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username='budget_reader')
+        cls.author = User.objects.create(username='budget_author')
+        cls.group = Group.objects.create(title='budget', slug='budget',
+                                         description='budget')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        # У всех записей одна картинка с уже созданными миниатюрами
+        cls.image = post_images.save('posts/budget.gif',
+                                     ContentFile(SMALL_GIF))
+        generate(cls.image)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def grow_to(self, size):
+        missing = size - Post.objects.count()
+        first_new_id = (Post.objects.order_by('-id')
+                        .values_list('id', flat=True).first() or 0) + 1
+        Post.objects.bulk_create(
+            (Post(text=f'post {i}', author=self.author, group=self.group,
+                  image=self.image, image_width=2, image_height=1)
+             for i in range(missing)),
+        )
+        FeedEntry.objects.bulk_create(
+            (FeedEntry(user=self.reader, post_id=post_id,
+                       author=self.author, pub_date=pub_date)
+             for post_id, pub_date in Post.objects.filter(
+                 id__gte=first_new_id)
+             .values_list('id', 'pub_date').iterator()),
+        )
+
+    def urls(self):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group': reverse('posts:group', args=[self.group.slug]),
+            'posts:profile': reverse('posts:profile',
+                                     args=[self.author.username]),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+    def test_feed_query_budgets(self):
+        for size in self.SIZES:
+            self.grow_to(size)
+            for name, url in self.urls().items():
+                cache.clear()
+                with self.subTest(view=name, posts=size):
+                    label = f'{name} with {size} posts'
+                    with query_budget(self, self.BUDGETS[name], label):
+                        response = self.authorized_client.get(
+                            url, {'page': 2})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertTrue(len(response.context['page']))
+                    self.assertContains(response, 'height="1"')
+
+
+class ExplainViewsCommandTest(TestCase):
+    def test_plan_warnings(self):
+        """Полные просмотры и временные сортировки помечаются."""
+        self.assertTrue(plan_warnings('SCAN posts_post'))
+        self.assertTrue(plan_warnings('USE TEMP B-TREE FOR ORDER BY'))
+        self.assertFalse(plan_warnings('SCAN posts_post USING INDEX x'))
+        self.assertFalse(
+            plan_warnings('SEARCH posts_post USING INDEX x (author_id=?)'))
+
+    def test_feed_views_use_indexes(self):
+        """Ленты главной, автора и сообщества читаются по индексу."""
+        out = StringIO()
+        call_command('explain_views', posts=20, stdout=out)
+        output = out.getvalue()
+        for name in ('posts:index', 'posts:group', 'posts:profile'):
+            with self.subTest(view=name):
+                self.assertIn(name, output)
+        self.assertIn('USING INDEX post_pub_date', output)
+        self.assertIn('USING INDEX post_author_pub_date', output)
+        self.assertIn('USING INDEX post_group_pub_date', output)
+        self.assertFalse(Post.objects.exists())
+
+    def test_site_cache_is_untouched(self):
+        """Откаченные записи не остаются в кэше страниц сайта."""
+        cache.clear()
+        self.assertNotContains(Client().get(reverse('posts:index')),
+                               'explain')
+        call_command('explain_views', posts=5, stdout=StringIO())
+        self.assertNotContains(Client().get(reverse('posts:index')),
+                               'explain')
@@ -0,0 +1,87 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='limited_author')
+        cls.reader = User.objects.create(username='limited_reader')
+        cls.post = Post.objects.create(text='limited', author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def comment(self, client=None):
+        return (client or self.authorized_client).post(
+            reverse('posts:add_comment',
+                    args=[self.author.username, self.post.id]),
+            {'text': 'comment'})
+
+    @override_settings(RATELIMITS={'posts:add_comment': {'user': '2/m'}})
+    def test_user_limit(self):
+        """Сверх лимита пользователь получает 429, комментарий не пишется."""
+        for _ in range(2):
+            self.assertEqual(self.comment().status_code, 302)
+        response = self.comment()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Comment.objects.count(), 2)
+
+        other = Client()
+        other.force_login(self.author)
+        self.assertEqual(self.comment(other).status_code, 302)
+
+    @override_settings(RATELIMITS={'posts:add_comment': {'ip': '1/m'}})
+    def test_ip_limit_before_database(self):
+        """Лимит по IP отвечает 429 без единого запроса к БД."""
+        self.comment()
+        with self.assertNumQueries(0):
+            response = Client().post(reverse(
+                'posts:add_comment',
+                args=[self.author.username, self.post.id]))
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(RATELIMITS={
+        'posts:add_comment': {'user': '1/m', 'ip': '2/m'}})
+    def test_rejected_request_takes_no_tokens(self):
+        """Запрос, отклонённый по лимиту пользователя, не тратит лимит IP."""
+        self.assertEqual(self.comment().status_code, 302)
+        self.assertEqual(self.comment().status_code, 429)
+        other = Client()
+        other.force_login(self.author)
+        self.assertEqual(self.comment(other).status_code, 302)
+        self.assertEqual(self.comment(other).status_code, 429)
+
+    @override_settings(
+        RATELIMITS={'posts:add_comment': {'user': '1/m'}},
+        SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_user_limit_reads_only_the_session(self):
+        """Лимит пользователя стоит одного запроса - чтения сессии."""
+        client = Client()
+        client.force_login(self.reader)
+        self.comment(client)
+        with self.assertNumQueries(1):
+            response = self.comment(client)
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(RATELIMITS={
+        'posts:new_post': {'user': '1/m'},
+        'posts:profile_follow': {'user': '1/m'},
+    })
+    def test_only_writes_are_counted(self):
+        """Форма открывается без ограничений, подписка ограничена."""
+        for _ in range(3):
+            response = self.authorized_client.get(reverse('posts:new_post'))
+            self.assertEqual(response.status_code, 200)
+        url = reverse('posts:profile_follow', args=[self.author.username])
+        self.assertEqual(self.authorized_client.get(url).status_code, 302)
+        self.assertEqual(self.authorized_client.get(url).status_code, 429)
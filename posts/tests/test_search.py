@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Group, Post
+from posts.search import match_expression, search_post_ids
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create(username='search_author')
+        group = Group.objects.create(title='Аквариумы', slug='fish',
+                                     description='fish')
+        old = Post.objects.create(text='Мой кот спит', author=author)
+        Post.objects.create(text='Наш кот играет', author=author,
+                            group=group)
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=365))
+
+    def setUp(self):
+        self.guest_client = Client()
+        # тесты меняют объекты - каждый получает свои копии
+        self.author = User.objects.get(username='search_author')
+        self.group = Group.objects.get(slug='fish')
+        self.old = Post.objects.get(text='Мой кот спит')
+        self.new = Post.objects.get(text='Наш кот играет')
+
+    def test_ranked_by_relevance_and_recency(self):
+        """При равной релевантности свежие записи выше."""
+        self.assertEqual(search_post_ids('кот'), [self.new.pk, self.old.pk])
+        self.assertEqual(search_post_ids('кот спит'), [self.old.pk])
+        # слова ищутся и как начало слова
+        self.assertEqual(search_post_ids('игра'), [self.new.pk])
+
+    def test_author_and_group_are_indexed(self):
+        """Ищутся имя автора и название сообщества."""
+        self.assertEqual(search_post_ids('аквариумы'), [self.new.pk])
+        self.assertEqual(len(search_post_ids('search_author')), 2)
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении записей, авторов и сообществ."""
+        self.new.text = 'Наш пёс играет'
+        self.new.save()
+        self.assertEqual(search_post_ids('кот'), [self.old.pk])
+        self.assertEqual(search_post_ids('пёс'), [self.new.pk])
+
+        self.group.title = 'Террариумы'
+        self.group.save()
+        self.assertEqual(search_post_ids('террариумы'), [self.new.pk])
+        self.author.username = 'renamed_author'
+        self.author.save()
+        self.assertEqual(len(search_post_ids('renamed_author')), 2)
+
+        self.old.delete()
+        self.assertEqual(search_post_ids('спит'), [])
+
+    def test_short_words_are_not_prefixes(self):
+        """Слова короче трёх букв ищутся целиком, а не как начало слова."""
+        self.assertEqual(match_expression('мой кот я'), '"мой"* "кот"* "я"')
+        self.assertEqual(search_post_ids('на'), [])
+        Post.objects.create(text='на', author=self.author)
+        self.assertEqual(len(search_post_ids('на')), 1)
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не ломают запрос."""
+        for query in ('кот" OR', 'NEAR(кот', '*', '"'):
+            with self.subTest(query=query):
+                self.guest_client.get(reverse('posts:search'), {'q': query})
+        self.assertEqual(search_post_ids('кот AND'), [])
+
+    def test_search_page_keeps_query_in_links(self):
+        """Ссылки паджинатора сохраняют поисковый запрос."""
+        for i in range(12):
+            Post.objects.create(text=f'рыба {i}', author=self.author)
+        response = self.guest_client.get(reverse('posts:search'),
+                                         {'q': 'рыба'})
+        self.assertEqual(len(response.context['page']), 10)
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertContains(response, 'href="?q=%D1%80%D1%8B%D0%B1%D0%B0'
+                                      '&amp;page=2"')
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по тексту в полнотекстовом индексе, без
+        ограничения числа совпадений."""
+        admin = User.objects.create_superuser('search_admin', 'a@a.ru', 'x')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:posts_post_changelist')
+        response = client.get(url, {'q': 'игра'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.new])
+        # автор и сообщество в админке не ищутся
+        response = client.get(url, {'q': 'аквариумы'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+        with self.settings(SEARCH_MAX_RESULTS=1):
+            response = client.get(url, {'q': 'кот'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+from posts.models import Post
+from posts.storage import ContentAddressedStorage
+from posts.sorl_internals import thumbnail_file
+from posts.thumbnails import (CARD_OPTIONS, CARD_WIDTHS, _source,
+                              card_geometry, card_variants)
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковое содержимое сохраняется в один файл с именем по хэшу."""
+        storage = ContentAddressedStorage()
+        first = storage.save('posts/a.JPG', ContentFile(b'photo'))
+        second = storage.save('posts/b.jpg', ContentFile(b'photo'))
+        other = storage.save('posts/a.jpg', ContentFile(b'other photo'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertRegex(first, r'^posts/([0-9a-f]{2})/\1[0-9a-f]{62}\.jpg$')
+        self.assertEqual(len(os.listdir(os.path.dirname(storage.path(first)))),
+                         1)
+
+
+class CardImageTest(TestCase):
+    def render(self, **fields):
+        return Template('{% load feed_tags %}{% card_image image %}').render(
+            Context({'image': Post(image='posts/ab/missing.jpg',
+                                   **fields).image}))
+
+    def test_srcset_lists_every_width(self):
+        """Картинка карточки отдаётся в нескольких ширинах через srcset."""
+        html = self.render(image_width=1920, image_height=1080)
+        for width in (320, 640, 960):
+            self.assertIn(f' {width}w', html)
+        self.assertIn('sizes="(max-width: 960px) 100vw, 960px"', html)
+        self.assertIn('width="960" height="540"', html)
+
+    def test_narrow_image_is_not_upscaled(self):
+        """Варианты шире оригинала не попадают в srcset."""
+        html = self.render(image_width=500, image_height=1000)
+        self.assertIn(' 320w', html)
+        self.assertIn(' 500w', html)
+        self.assertNotIn(' 640w', html)
+        self.assertNotIn(' 960w', html)
+        self.assertIn('width="500" height="1000"', html)
+
+    def test_unknown_size_is_omitted(self):
+        """Без известных размеров у картинки нет width и height."""
+        html = self.render()
+        self.assertIn(' 960w', html)
+        self.assertNotIn('width=', html)
+
+    def test_variants_are_fetched_in_bulk(self):
+        """Известные sorl миниатюры берутся из кэша без запросов к БД."""
+        cache.clear()
+        names = ['posts/aa/first.jpg', 'posts/bb/second.jpg']
+        for name in names:
+            for width in CARD_WIDTHS:
+                thumbnail = thumbnail_file(
+                    _source(name), card_geometry(width), CARD_OPTIONS)
+                thumbnail.set_size((width, 1))
+                default.kvstore.set(thumbnail)
+
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            with self.assertNumQueries(0):
+                variants = card_variants(names)
+        get_thumbnail.assert_not_called()
+        self.assertEqual([width for width, thumbnail in variants[names[0]]],
+                         list(CARD_WIDTHS))
+
+    @mock.patch('posts.sorl_internals.SUPPORTED', False)
+    def test_unchecked_sorl_uses_public_api(self):
+        """С непроверенной версией sorl миниатюры берутся get_thumbnail."""
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            variants = card_variants(['posts/aa/first.jpg'])
+        self.assertEqual(get_thumbnail.call_count, len(CARD_WIDTHS))
+        self.assertEqual(len(variants['posts/aa/first.jpg']),
+                         len(CARD_WIDTHS))
@@ -0,0 +1,104 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(STREAMING_FEEDS=True, STREAMING_FEED_CHUNK=4)
+class StreamingFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='stream_author')
+        cls.group = Group.objects.create(title='stream', slug='stream',
+                                         description='stream')
+        for i in range(12):
+            Post.objects.create(text=f'stream post {i}', author=cls.author,
+                                group=cls.group)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        cache.clear()
+
+    def test_head_is_sent_before_posts(self):
+        """Шапка страницы уходит первой, карточки - пачками."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        # шапка, 10 карточек по 4 и хвост страницы
+        self.assertEqual(len(chunks), 5)
+        self.assertIn('bootstrap.min.css', chunks[0])
+        self.assertNotIn('stream post', chunks[0])
+        self.assertIn('stream post 11', chunks[1])
+        self.assertIn('</html>', chunks[-1])
+        html = ''.join(chunks)
+        self.assertLess(html.index('stream post 11'),
+                        html.index('stream post 2'))
+        self.assertNotIn('stream post 1<', html)
+
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group', args=['stream']),
+            reverse('posts:profile', args=['stream_author']),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                # число записей для ссылок паджинатора попадает в кэш
+                b''.join(self.guest_client.get(url).streaming_content)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(url)
+                    head = next(response.streaming_content).decode()
+                self.assertNotIn('stream post', head)
+                # до шапки - только id и updated_at записей для ETag
+                for query in queries:
+                    self.assertNotIn('"posts_post"."text"', query['sql'])
+                    self.assertNotIn('COUNT(', query['sql'])
+                with CaptureQueriesContext(connection) as queries:
+                    b''.join(response.streaming_content)
+                self.assertTrue(any('"posts_post"."text"' in query['sql']
+                                    for query in queries))
+
+    def test_feed_pages_stream(self):
+        """Ленты сообщества, автора и подписок тоже отдаются потоком."""
+        Follow.objects.create(
+            user=User.objects.create(username='stream_reader'),
+            author=self.author)
+        reader = Client()
+        reader.force_login(User.objects.get(username='stream_reader'))
+        pages = (
+            (self.guest_client, reverse('posts:group', args=['stream'])),
+            (self.guest_client, reverse('posts:profile',
+                                        args=['stream_author'])),
+            (reader, reverse('posts:follow_index')),
+            (self.guest_client, reverse('posts:index') + '?page=2'),
+        )
+        for client, url in pages:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertTrue(response.streaming)
+                html = b''.join(response.streaming_content).decode()
+                self.assertIn('stream post', html)
+                self.assertIn('</html>', html)
+
+    def test_author_sees_edit_links(self):
+        """Ссылки редактирования подставляются и в потоковые карточки."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        html = b''.join(response.streaming_content).decode()
+        self.assertEqual(html.count('Редактировать'), 10)
+
+    def test_cursor_links_follow_streamed_posts(self):
+        """Курсоры ссылок паджинатора строятся по отданным записям."""
+        response = self.guest_client.get(reverse('posts:index'))
+        html = b''.join(response.streaming_content).decode()
+        self.assertNotIn('stream-next-cursor', html)
+        cursor = html.split('?cursor=')[1].split('"')[0]
+        response = Client().get(reverse('posts:index'), {'cursor': cursor})
+        self.assertEqual(list(response.context['page']),
+                         list(Post.objects.all()[10:]))
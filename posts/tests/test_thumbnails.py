@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='thumb_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        cache.clear()
+
+    def upload(self):
+        return SimpleUploadedFile(name='small.gif', content=SMALL_GIF,
+                                  content_type='image/gif')
+
+    def test_new_post_schedules_thumbnails(self):
+        """Новая запись с картинкой ставит миниатюры в очередь."""
+        with mock.patch('posts.views.schedule_thumbnails') as schedule:
+            self.authorized_client.post(
+                reverse('posts:new_post'),
+                data={'text': 'with image', 'image': self.upload()})
+        post = Post.objects.get(text='with image')
+        schedule.assert_called_once_with(post)
+
+    def test_command_generates_thumbnails(self):
+        """Команда создаёт миниатюры и считает битые картинки."""
+        Post.objects.create(text='ok', author=self.author,
+                            image=self.upload())
+        Post.objects.create(text='missing', author=self.author,
+                            image='posts/missing.gif')
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('Обработано картинок: 1, с ошибками: 1',
+                      out.getvalue())
@@ -0,0 +1,154 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from posts.models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class FollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='feed_reader')
+        cls.author = User.objects.create(username='feed_author')
+        cls.old_post = Post.objects.create(text='old', author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page']]
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        """Подписка переносит старые записи, новые рассылаются сразу."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+
+        Post.objects.create(text='new', author=self.author)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(self.feed(), ['new', 'old'])
+
+    def test_unfollow_removes_entries(self):
+        """После отписки записи автора пропадают из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_popular_author_posts_are_merged(self):
+        """Записи популярного автора подмешиваются в ленту при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='new', author=self.author)
+        self.assertFalse(post.fanned_out)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), ['new', 'old'])
+
+        other = User.objects.create(username='feed_other')
+        Follow.objects.create(user=other, author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+
+    def test_merged_posts_stay_when_followers_leave(self):
+        """Запись не пропадает из ленты, когда подписчиков становится
+        меньше порога."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with self.settings(FEED_FANOUT_MAX_FOLLOWERS=0):
+            Post.objects.create(text='new', author=self.author)
+        self.assertEqual(self.feed(), ['new', 'old'])
+
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.feed(), [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.clear()
+        self.assertEqual(self.feed(), ['new', 'old'])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_merged_feed_pages_by_cursor(self):
+        """Смешанная лента листается тем же курсором."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(12):
+            Post.objects.create(text=f'post {i}', author=self.author)
+        url = reverse('posts:follow_index')
+        page = self.authorized_client.get(url).context['page']
+        self.assertEqual(len(page), 10)
+        response = self.authorized_client.get(
+            url, {'cursor': page.next_cursor()})
+        self.assertEqual([post.text for post in response.context['page']],
+                         ['post 1', 'post 0', 'old'])
+
+    def test_feed_pages_by_inbox(self):
+        """Лента листается курсором по записям ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(12):
+            Post.objects.create(text=f'post {i}', author=self.author)
+        entry = FeedEntry.objects.get(user=self.reader, post=self.old_post)
+        self.assertEqual(entry.pub_date, self.old_post.pub_date)
+
+        url = reverse('posts:follow_index')
+        page = self.authorized_client.get(url).context['page']
+        self.assertEqual(len(page), 10)
+        response = self.authorized_client.get(
+            url, {'cursor': page.next_cursor()})
+        self.assertEqual([post.text for post in response.context['page']],
+                         ['post 1', 'post 0', 'old'])
+
+
+class FollowFeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='cached_reader')
+        cls.author = User.objects.create(username='cached_author')
+        cls.stranger = User.objects.create(username='cached_stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(text='cached', author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def get_feed(self):
+        return self.authorized_client.get(reverse('posts:follow_index'))
+
+    def test_feed_is_cached_per_reader(self):
+        """Повторный запрос ленты берётся из кэша."""
+        first = self.get_feed()
+        # update() не отправляет сигналы - лента остаётся в кэше
+        Post.objects.filter(pk=self.post.pk).update(text='changed')
+        self.assertEqual(first.content, self.get_feed().content)
+        # Запись постороннего автора ленту читателя не сбрасывает
+        Post.objects.create(text='stranger post', author=self.stranger)
+        self.assertEqual(first.content, self.get_feed().content)
+
+    def test_followed_author_post_invalidates_feed(self):
+        """Новая запись автора из подписок сразу видна в ленте."""
+        self.get_feed()
+        Post.objects.create(text='brand new', author=self.author)
+        self.assertContains(self.get_feed(), 'brand new')
+
+    def test_follow_change_invalidates_feed(self):
+        """Подписка на нового автора сразу меняет ленту."""
+        Post.objects.create(text='stranger post', author=self.stranger)
+        self.get_feed()
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.stranger.username]))
+        self.assertContains(self.get_feed(), 'stranger post')
+
+    def test_follow_change_updates_count(self):
+        """Число записей ленты меняется сразу после подписки и отписки."""
+        Post.objects.create(text='stranger post', author=self.stranger)
+        self.assertEqual(self.get_feed().context['paginator'].count, 1)
+        url = reverse('posts:profile_follow', args=[self.stranger.username])
+        self.authorized_client.get(url)
+        self.assertEqual(self.get_feed().context['paginator'].count, 2)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.stranger.username]))
+        self.assertEqual(self.get_feed().context['paginator'].count, 1)
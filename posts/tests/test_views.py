@@ -210,21 +210,33 @@ class TaskPagesTests(TestCase):
                 self.assertEqual(image, post.image)
 
     def test_cache(self):
-        # Check response before post creating
-        response_zero = self.authorized_client.get(reverse('posts:index'))
-        # Create post
+        """Главная страница берётся из кэша, пока записи не изменились."""
         post = Post.objects.create(author=self.author, text='test_text_cash_1')
         response_first = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.filter(id=post.id).delete()
+        self.assertContains(response_first, 'test_text_cash_1')
 
-        # Response deleted in Database but On page it should be saved
+        # update() не отправляет сигналы - страница остаётся в кэше
+        Post.objects.filter(id=post.id).update(text='test_text_cash_2')
         response_second = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(response_first.content, response_second.content)
 
-        # Post should be deleted on page with clear cache
-        cache.clear()
+        # Удаление записи сразу сбрасывает кэш ленты
+        post.delete()
         response_third = self.authorized_client.get(reverse('posts:index'))
-        self.assertEqual(response_zero.content, response_third.content)
+        self.assertNotContains(response_third, 'test_text_cash')
+
+    def test_group_and_profile_cache_invalidation(self):
+        """Новая запись сразу видна на страницах группы и автора."""
+        urls = (reverse('posts:group', args=[self.group.slug]),
+                reverse('posts:profile', args=[self.author.username]))
+        for url in urls:
+            self.authorized_client.get(url)
+        Post.objects.create(author=self.author, group=self.group,
+                            text='fresh_group_post')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'fresh_group_post')
 
 
 class PostCreateTest(TestCase):
@@ -0,0 +1,147 @@
+"""Thumbnail pre-generation for ``Post.image``.
+
+sorl-thumbnail creates a thumbnail the first time a template asks for it,
+so the first feed request showing a fresh upload would decode and resize the
+full-size original. ``schedule`` renders every size from ``THUMBNAIL_SIZES``
+in a background thread once the post is committed; the
+``generate_thumbnails`` command does the same for existing images.
+
+``card_variants`` looks up the card thumbnails of many images at once: a
+``{% thumbnail %}`` call per image and width would query sorl's key-value
+store once each; the sorl internals this takes are kept in
+``sorl_internals``. ``registered_thumbnails`` tells the thumbnail files
+sorl still knows from the ones left behind.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from . import sorl_internals
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Ширины картинки карточки для srcset; пропорции - как у оригинала,
+# а уже оригинала картинка не растягивается
+CARD_WIDTHS = (320, 640, 960)
+CARD_OPTIONS = {'upscale': False}
+
+
+def card_geometry(width):
+    return '%d' % width
+
+
+def card_size(width, image_width, image_height):
+    """``(width, height)`` of the card variant ``width`` of an image of
+    ``image_width`` x ``image_height``."""
+    width = min(width, image_width)
+    return width, round(width * image_height / image_width)
+
+
+# Все размеры, которые запрашивают шаблоны (тег card_image в post_item.html)
+THUMBNAIL_SIZES = tuple((card_geometry(width), CARD_OPTIONS)
+                        for width in CARD_WIDTHS)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails')
+    return _executor
+
+
+def _source(name):
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def card_variants(names):
+    """Return ``{name: [(width, thumbnail), ...]}`` with the card
+    thumbnails of the images ``names``.
+
+    Thumbnails known to sorl's key-value store are fetched from its cache
+    with one ``get_many``, the ones missing there from its table with one
+    query; only the rest go through ``get_thumbnail``.
+    """
+    wanted = []
+    for name in set(names):
+        source = _source(name)
+        for width in CARD_WIDTHS:
+            wanted.append((name, width, source, sorl_internals.thumbnail_file(
+                source, card_geometry(width), CARD_OPTIONS)))
+
+    thumbnails = [thumbnail for *_, thumbnail in wanted
+                  if thumbnail is not None]
+    found = sorl_internals.cached_thumbnails(thumbnails) or {}
+    missing = [thumbnail for thumbnail in thumbnails
+               if thumbnail not in found]
+    if missing:
+        found.update(sorl_internals.stored_thumbnails(missing) or {})
+
+    variants = {}
+    for name, width, source, thumbnail in wanted:
+        thumbnail = found.get(thumbnail)
+        if thumbnail is None:
+            # Нет в хранилище sorl - он и создаст миниатюру
+            thumbnail = get_thumbnail(source, card_geometry(width),
+                                      **CARD_OPTIONS)
+        variants.setdefault(name, []).append((width, thumbnail))
+    for thumbnails in variants.values():
+        thumbnails.sort(key=lambda variant: variant[0])
+    return variants
+
+
+def registered_thumbnails(names):
+    """The thumbnail files among ``names`` that sorl's key-value store
+    has a record of, with one query for the database store."""
+    thumbnails = [ImageFile(name, default.storage) for name in names]
+    found = sorl_internals.stored_names(thumbnails)
+    if found is not None:
+        return found
+    return {thumbnail.name for thumbnail in thumbnails
+            if default.kvstore.get(thumbnail) is not None}
+
+
+def generate(name):
+    """Create every thumbnail of the image stored as ``name``.
+
+    Return the ``(width, height)`` of the original, or ``None`` if it could
+    not be processed.
+    """
+    source = _source(name)
+    try:
+        for geometry, options in THUMBNAIL_SIZES:
+            thumbnail = get_thumbnail(source, geometry, **options)
+            # sorl не создаёт миниатюру, если оригинал не читается
+            if not thumbnail.exists():
+                return None
+        # Размер оригинала sorl уже записал в своё хранилище
+        return tuple(default.kvstore.get_or_set(source).size)
+    except Exception:
+        logger.exception('Cannot generate thumbnails for %s', name)
+        return None
+
+
+def _generate_in_thread(name):
+    try:
+        generate(name)
+    finally:
+        # У потока пула своё соединение с БД (в нём хранит данные sorl)
+        connection.close()
+
+
+def schedule(post):
+    """Generate the thumbnails of ``post.image`` after the current
+    transaction commits, outside of the request."""
+    if not post.image:
+        return
+    name = post.image.name
+    transaction.on_commit(
+        lambda: _get_executor().submit(_generate_in_thread, name))
@@ -0,0 +1,30 @@
+"""Upload handler that keeps web workers' memory flat.
+
+Django's default handlers keep uploads under 2.5 MB in memory and stream
+larger ones to disk without any size limit. ``LimitedUploadHandler``
+always streams to a temporary file and stops writing once the file grows
+past ``UPLOAD_MAX_BYTES``. The rest of the body is read and dropped. The
+file is marked ``too_large`` so that the form can reject it with a proper
+message.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file.too_large = False
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_BYTES:
+            if not self.file.too_large:
+                # Уже записанное на диск тоже не нужно
+                self.file.too_large = True
+                self.file.seek(0)
+                self.file.truncate()
+            return
+        self.file.write(raw_data)
@@ -15,6 +15,7 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group'),
     path('new/', views.new_post, name='new_post'),
+    path('search/', views.search, name='search'),
     # mistakes
     path('404/', views.page_not_found, name='404'),
     path('500/', views.server_error, name='500'),
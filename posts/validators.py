@@ -1,7 +1,32 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 
 
 def validate_not_empty(value):
 
     if value == '':
         raise forms.ValidationError(params={'value': value})
+
+
+def validate_upload_size(value):
+    """Reject a file that ``LimitedUploadHandler`` stopped saving."""
+    if getattr(value, 'too_large', False):
+        raise forms.ValidationError(
+            'Файл больше %(limit)s.',
+            code='file_too_large',
+            params={'limit': filesizeformat(settings.UPLOAD_MAX_BYTES)})
+
+
+def validate_image_pixels(value):
+    """Check the dimensions read from the image header by
+    ``forms.ImageField`` before anything decodes the pixels."""
+    image = getattr(value, 'image', None)
+    if image is None:
+        return
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise forms.ValidationError(
+            'Слишком большое изображение: %(width)s×%(height)s.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height})
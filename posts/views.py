@@ -1,102 +1,299 @@
+import hashlib
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
+from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
-from .models import Post, Group, User, Follow
+from django.db import transaction
+from django.db.models import QuerySet
+from django.views.decorators.http import condition
+from .models import Post, Group, User, Follow, UserStats
 from .forms import PostForm, CommentForm
-from django.core.paginator import Paginator
 from django.http import Http404
+from .cache import (GLOBAL, author_scope, count_key, feed_version,
+                    follow_feed_version, following_scope, group_scope)
+from .feeds import feed_queryset
+from .paginator import (CURSOR_PARAM, CursorPaginator, add_cursors,
+                        feed_page, feed_paginator)
+from .ratelimit import ratelimit
+from .search import search_post_ids
+from .streaming import render_feed
+from .thumbnails import schedule as schedule_thumbnails
+from .timeline import INBOX_ORDERING, follow_feed
+
+
+def paginate(request, post_list, per_page=10, seek_on=None,
+             **count_options):
+    """Paginate a feed by ``?page=N`` or, if given, by ``?cursor=``.
+
+    The previous and next links of every page are cursors; numbers only
+    serve the page links, up to ``FEED_MAX_PAGE``, so that no request
+    skips more than that many pages with ``OFFSET``. ``seek_on`` is passed
+    to ``CursorPaginator``; ``count_options`` are passed to
+    ``feed_paginator`` to take the number of posts from a counter or the
+    cache instead of ``COUNT(*)``.
+    """
+    cursor = request.GET.get(CURSOR_PARAM)
+    if cursor is not None:
+        paginator = CursorPaginator(post_list, per_page, seek_on=seek_on)
+        return paginator, paginator.get_page(cursor)
+    paginator = feed_paginator(post_list, per_page, **count_options)
+    # Из URL извлекаем номер запрошенной страницы - это значение параметра page
+    # и получаем набор записей для страницы с запрошенным номером
+    page = feed_page(paginator, request.GET.get('page'),
+                     settings.FEED_MAX_PAGE)
+    return paginator, add_cursors(page, seek_on=seek_on)
+
+
+def _once(request, key, build):
+    """``build()``, called once per request for ``key``: the page ETag and
+    the view itself both need the result."""
+    found = request.__dict__.setdefault('_once', {})
+    if key not in found:
+        found[key] = build()
+    return found[key]
+
+
+def _lookup(request, queryset, **lookup):
+    """``queryset.get(**lookup)`` or ``None``, fetched once per request."""
+    key = (queryset.model, tuple(sorted(lookup.items())))
+    return _once(request, key, lambda: queryset.filter(**lookup).first())
+
+
+def _get_or_404(request, queryset, **lookup):
+    obj = _lookup(request, queryset, **lookup)
+    if obj is None:
+        raise Http404(f'No {queryset.model._meta.object_name} matches')
+    return obj
+
+
+def _authors():
+    return User.objects.select_related('stats')
+
+
+def _index_page(request):
+    return _once(request, 'index', lambda: paginate(
+        request, feed_queryset(), count_key=count_key(GLOBAL)))
+
+
+def _group_page(request, group):
+    return _once(request, ('group', group.id), lambda: paginate(
+        request, feed_queryset(group.posts.all()),
+        count_key=count_key(group_scope(group.id))))
+
+
+def _profile_page(request, author):
+    return _once(request, ('profile', author.id), lambda: paginate(
+        request, feed_queryset(author.posts.all()), 3,
+        count=UserStats.for_user(author).posts_count))
+
+
+def _following(request, author):
+    """Whether the viewer follows ``author``."""
+    return _once(request, ('following', author.id), lambda: (
+        request.user.is_authenticated
+        and Follow.objects.filter(user=request.user, author=author).exists()))
+
+
+def _page_etag(request, *state):
+    """ETag of a page that shows ``state`` to the viewer of ``request``.
+
+    ``state`` is read from the database, so every process computes the
+    same ETag. Besides it, the page depends on who is looking at it (the
+    menu, the edit links, the follow button) and embeds the CSRF token.
+    """
+    parts = [settings.PAGE_ETAG_VERSION, str(request.user.pk),
+             request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')]
+    parts += [str(part) for part in state]
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def _page_rows(page):
+    """``(pk, updated_at)`` of the posts on ``page``, read once.
+
+    A numbered page is a lazy slice: only these two columns are selected
+    from it, and ``page.object_list`` is left for the view to render or
+    stream. A cursor page has already read its posts.
+    """
+    if not hasattr(page, 'validator_rows'):
+        if isinstance(page.object_list, QuerySet):
+            rows = list(page.object_list.values_list('pk', 'updated_at'))
+        else:
+            rows = [(post.pk, post.updated_at) for post in page.object_list]
+        page.validator_rows = rows
+    return page.validator_rows
+
+
+def _feed_state(paginator, page):
+    """What a feed page shows: its posts with their ``updated_at``, the
+    number of posts behind the page links and the neighbour links."""
+    return [getattr(paginator, 'count', None), page.number,
+            page.has_previous(), page.has_next()] + [
+        f'{pk}:{updated_at.timestamp()}'
+        for pk, updated_at in _page_rows(page)]
+
+
+def _feed_last_modified(paginator, page):
+    return max((updated_at for _, updated_at in _page_rows(page)),
+               default=None)
+
+
+def _author_state(request, author):
+    stats = UserStats.for_user(author)
+    return [author.pk, stats.posts_count, stats.followers_count,
+            stats.following_count, _following(request, author)]
+
+
+def index_etag(request):
+    return _page_etag(request, *_feed_state(*_index_page(request)))
+
+
+def group_etag(request, slug):
+    group = _lookup(request, Group.objects.all(), slug=slug)
+    if group is None:
+        return None
+    return _page_etag(request, group.title, group.description,
+                      *_feed_state(*_group_page(request, group)))
+
+
+def author_etag(request, username, post_id=None):
+    """ETag of the profile and post pages: the author's counters and the
+    page of posts or the post with its comment counter."""
+    author = _lookup(request, _authors(), username=username)
+    if author is None:
+        return None
+    if post_id is None:
+        return _page_etag(request, *_author_state(request, author),
+                          *_feed_state(*_profile_page(request, author)))
+    post = _lookup(request, feed_queryset(), id=post_id, author=author)
+    if post is None:
+        return None
+    return _page_etag(request, *_author_state(request, author),
+                      post.pk, post.updated_at.timestamp())
+
+
+# Last-Modified - по записям страницы. Счётчики и подписки в него не входят:
+# изменения их видит только ETag, а If-None-Match важнее If-Modified-Since
+def index_last_modified(request):
+    return _feed_last_modified(*_index_page(request))
+
+
+def group_last_modified(request, slug):
+    group = _lookup(request, Group.objects.all(), slug=slug)
+    if group is None:
+        return None
+    return _feed_last_modified(*_group_page(request, group))
+
+
+def author_last_modified(request, username, post_id=None):
+    author = _lookup(request, _authors(), username=username)
+    if author is None:
+        return None
+    if post_id is None:
+        return _feed_last_modified(*_profile_page(request, author))
+    post = _lookup(request, feed_queryset(), id=post_id, author=author)
+    return post and post.updated_at
 
 
 # Main page
+@condition(etag_func=index_etag,
+           last_modified_func=index_last_modified)
 def index(request):
     """Main page"""
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    # Из URL извлекаем номер запрошенной страницы - это значение параметра page
-    page_number = request.GET.get('page')
-    # Получаем набор записей для страницы с запрошенным номером
-    page = paginator.get_page(page_number)
+    paginator, page = _index_page(request)
     index_flg = True
-    return render(request,
-                  'posts/index.html',
-                  {'page': page,
-                   'paginator': paginator,
-                   'index_flg': index_flg}
-                  )
+    return render_feed(request,
+                       'posts/index.html',
+                       {'page': page,
+                        'paginator': paginator,
+                        'index_flg': index_flg,
+                        'feed_version': feed_version(request, GLOBAL)}
+                       )
 
 
 # Cтраницы сообщества
+@condition(etag_func=group_etag,
+           last_modified_func=group_last_modified)
 def group_posts(request, slug):
     """Group page"""
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.filter(group=group)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = _get_or_404(request, Group.objects.all(), slug=slug)
+    paginator, page = _group_page(request, group)
 
-    return render(request, 'group.html', {'group': group,
-                                          'page': page,
-                                          'paginator': paginator})
+    return render_feed(request, 'group.html', {
+        'group': group,
+        'page': page,
+        'paginator': paginator,
+        'feed_version': feed_version(request, group_scope(group.id)),
+    })
 
 
+@ratelimit(methods=('POST',))
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if (request.method == 'POST' and form.is_valid()):
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        # счётчики автора обновляются в той же транзакции
+        try:
+            with transaction.atomic():
+                post.save()
+                schedule_thumbnails(post)
+        finally:
+            form.close_image()
         return redirect('posts:index')
     return render(request, 'posts/new_post.html', {'form': form})
 
 
+@condition(etag_func=author_etag,
+           last_modified_func=author_last_modified)
 def profile(request, username):
     """Profile page"""
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=author)
-    paginator = Paginator(post_list, 3)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-
-    followers_count = Follow.objects.filter(author=author).count()
-    followings_count = Follow.objects.filter(user=author).count()
-    following = Follow.objects.filter(user__username=request.user,
-                                      author=author)
-
-    return render(request,
-                  'posts/profile.html',
-                  {'author': author,
-                   'page': page,
-                   'post_list': post_list,
-                   'paginator': paginator,
-                   'followers_count': followers_count,
-                   'followings_count': followings_count,
-                   'following': following
-                   })
+    author = _get_or_404(request, _authors(), username=username)
+    stats = UserStats.for_user(author)
+    post_list = feed_queryset(author.posts.all())
+    paginator, page = _profile_page(request, author)
 
+    following = _following(request, author)
 
+    return render_feed(request,
+                       'posts/profile.html',
+                       {'author': author,
+                        'page': page,
+                        'post_list': post_list,
+                        'paginator': paginator,
+                        'followers_count': stats.followers_count,
+                        'followings_count': stats.following_count,
+                        'following': following,
+                        'feed_version': feed_version(request,
+                                                     author_scope(author.id)),
+                        })
+
+
+@condition(etag_func=author_etag,
+           last_modified_func=author_last_modified)
 def post_view(request, username, post_id):
     """Post page"""
     form = CommentForm(request.POST or None)
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, id=post_id, author__username=username)
-    comments = post.comments.all()
+    author = _get_or_404(request, _authors(), username=username)
+    post = _get_or_404(request, feed_queryset(), id=post_id, author=author)
+    comments = post.comments.select_related('author')
     # Follow
-    followers_count = Follow.objects.filter(author=author).count()
-    followings_count = Follow.objects.filter(user=author).count()
-    following = Follow.objects.filter(user__username=request.user,
-                                      author=author)
+    stats = UserStats.for_user(author)
+    following = _following(request, author)
     context = {
         'form': form,
         'author': author,
         'post': post,
         'comments': comments,
-        'followers_count': followers_count,
-        'followings_count': followings_count,
+        'followers_count': stats.followers_count,
+        'followings_count': stats.following_count,
         'following': following
     }
     return render(request, 'posts/post.html', context)
 
 
+@ratelimit(methods=('POST',))
 @login_required
 def post_edit(request, username, post_id):
     guest = get_object_or_404(User, username=username)
@@ -110,7 +307,13 @@ def post_edit(request, username, post_id):
             edit_post = form.save(commit=False)
             post.text = edit_post.text
             post.group = edit_post.group
-            post.save()
+            try:
+                with transaction.atomic():
+                    post.save()
+                    if 'image' in form.changed_data:
+                        schedule_thumbnails(post)
+            finally:
+                form.close_image()
             return redirect('posts:post', username, post_id)
     form = PostForm(instance=post)
     return render(request, 'posts/new_post.html', {'form': form,
@@ -118,6 +321,7 @@ def post_edit(request, username, post_id):
                                                    })
 
 
+@ratelimit(methods=('POST',))
 @login_required
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
@@ -126,28 +330,48 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        # счётчик комментариев поста обновляется в той же транзакции
+        with transaction.atomic():
+            comment.save()
         # return redirect('posts:profile', post.author)
     return redirect('posts:post', post.author, post_id)
 
 
+def search(request):
+    """Search results, best matches first"""
+    query = request.GET.get('q', '').strip()
+    ids = search_post_ids(query) if query else []
+    # Совпадений не больше SEARCH_MAX_RESULTS - их id листаются в памяти
+    paginator = Paginator(ids, 10)
+    page = paginator.get_page(request.GET.get('page'))
+    posts = feed_queryset().in_bulk(page.object_list)
+    page.object_list = [posts[pk] for pk in page.object_list if pk in posts]
+    return render(request, 'posts/search.html', {
+        'page': page,
+        'paginator': paginator,
+        'query': query,
+    })
+
+
 @login_required
 def follow_index(request):
     """Favorite authors"""
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = feed_queryset(follow_feed(request.user))
+    paginator, page = paginate(
+        request, post_list, seek_on=INBOX_ORDERING,
+        count_key=count_key(following_scope(request.user.pk)))
     follow = True
-    return render(request,
-                  'posts/follow.html',
-                  {'page': page,
-                   'paginator': paginator,
-                   'follow': follow,
-                   }
-                  )
+    return render_feed(request,
+                       'posts/follow.html',
+                       {'page': page,
+                        'paginator': paginator,
+                        'follow': follow,
+                        'feed_version': follow_feed_version(request),
+                        }
+                       )
 
 
+@ratelimit
 @login_required
 def profile_follow(request, username):
     """Def for author unfollowing"""
@@ -157,6 +381,7 @@ def profile_follow(request, username):
     return redirect('posts:profile', username)
 
 
+@ratelimit
 @login_required
 def profile_unfollow(request, username):
     """Def for author unfollowing"""
@@ -1,3 +1,25 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 
-# Register your models here.
+User = get_user_model()
+
+
+class PrefixSearchUserAdmin(UserAdmin):
+    """``UserAdmin`` that finds users by the beginning of the username:
+    a range over the username index instead of ``LIKE '%term%'`` on four
+    columns. It also serves the author autocomplete of the other admins."""
+
+    search_fields = ('username',)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(username__gte=term,
+                               username__lt=term + '\U0010ffff'), False
+
+
+# django.contrib.auth.admin уже зарегистрировал стандартный UserAdmin
+admin.site.unregister(User)
+admin.site.register(User, PrefixSearchUserAdmin)
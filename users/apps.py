@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        # сбрасываем закэшированного пользователя при его изменении
+        from . import signals  # noqa: F401
+        # предупреждаем о сессиях в кэше отдельного процесса
+        from . import checks  # noqa: F401
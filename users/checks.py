@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from yatube.caches import is_shared
+
+CACHE_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    """Sessions kept in a per-process cache are not seen by the other
+    processes and outlive their deletion from the database."""
+    if settings.SESSION_ENGINE not in CACHE_SESSION_ENGINES:
+        return []
+    if is_shared(settings.SESSION_CACHE_ALIAS):
+        return []
+    return [Warning(
+        f'{settings.SESSION_ENGINE} stores sessions in a LocMemCache.',
+        hint=('Every process keeps its own copy of a session. Use a shared '
+              'cache (memcached, Redis) or the db session engine.'),
+        id='users.W001',
+    )]
@@ -0,0 +1,71 @@
+"""Authentication with the user taken from a shared cache.
+
+``AuthenticationMiddleware`` loads ``request.user`` with one
+``auth_user`` query per request. ``CachedAuthenticationMiddleware`` keeps
+the user in the cache under ``user_key(id)`` for ``USER_CACHE_TIMEOUT``
+seconds, but only if the cache is shared by all processes; with
+``LocMemCache`` it loads the user from the database like
+``AuthenticationMiddleware``.
+
+``users.signals`` drops the cached user when it is saved or deleted
+through the ORM; ``update()`` and raw SQL leave it cached until the
+timeout. The session hash is checked against the cached user, so a
+password change saved with ``save()`` logs out the other sessions right
+away.
+"""
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY, get_user_model, load_backend)
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from yatube.caches import is_shared
+
+
+def user_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def get_user(request):
+    """``django.contrib.auth.get_user`` that reads the user from the
+    cache and puts it there on a miss."""
+    try:
+        user_id = get_user_model()._meta.pk.to_python(
+            request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    key = user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = load_backend(backend_path).get_user(user_id)
+        if user is None:
+            return AnonymousUser()
+        cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+
+    if hasattr(user, 'get_session_auth_hash'):
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if not (session_hash and constant_time_compare(
+                session_hash, user.get_session_auth_hash())):
+            request.session.flush()
+            return AnonymousUser()
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+
+    def process_request(self, request):
+        if not is_shared():
+            # Пользователь из кэша процесса не узнал бы о сменах пароля
+            # и удалениях, сделанных в других процессах
+            return super().process_request(request)
+        assert hasattr(request, 'session'), (
+            'CachedAuthenticationMiddleware requires SessionMiddleware '
+            'to be installed before it.')
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .middleware import user_key
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # Сбрасываем сразу и ещё раз после коммита: иначе параллельный запрос
+    # успел бы положить в кэш незакоммиченную старую версию
+    key = user_key(instance.pk)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,108 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.checks import Warning
+from django.urls import reverse
+
+from users.checks import check_session_cache
+from users.middleware import user_key
+
+User = get_user_model()
+
+SHARED_CACHE = tempfile.mkdtemp()
+SHARED_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': SHARED_CACHE,
+}}
+
+
+@override_settings(CACHES=SHARED_CACHES,
+                   SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class CachedAuthenticationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User.objects.create_user(username='cached_user',
+                                 password='old-password')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(SHARED_CACHE, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='cached_user')
+        self.client = Client()
+        self.client.login(username='cached_user', password='old-password')
+
+    def test_warm_request_has_no_auth_queries(self):
+        """С тёплым кэшем страница не читает ни сессию, ни пользователя."""
+        url = reverse('about:author')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'cached_user')
+
+    def test_saved_user_is_reloaded(self):
+        """После сохранения пользователь читается из БД заново."""
+        url = reverse('about:author')
+        self.client.get(url)
+        self.assertIsNotNone(cache.get(user_key(self.user.pk)))
+        self.user.username = 'renamed_user'
+        self.user.save()
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+        self.assertContains(self.client.get(url), 'renamed_user')
+
+    def test_password_change_logs_out(self):
+        """Смена пароля завершает остальные сессии."""
+        url = reverse('posts:new_post')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.client.get(url)
+        self.assertRedirects(response, '/auth/login/?next=' + url)
+
+
+class LocalCacheAuthenticationTest(TestCase):
+    """С кэшем в памяти процесса сессия и пользователь читаются из БД."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User.objects.create_user(username='local_user', password='password')
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='local_user')
+        self.client = Client()
+        self.client.login(username='local_user', password='password')
+
+    def test_user_is_not_cached(self):
+        """Пользователь не кладётся в кэш процесса."""
+        self.client.get(reverse('about:author'))
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+
+    def test_deleted_db_session_logs_out(self):
+        """Удаление сессии из БД сразу завершает её."""
+        url = reverse('posts:new_post')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        Session.objects.all().delete()
+        response = self.client.get(url)
+        self.assertRedirects(response, '/auth/login/?next=' + url)
+
+    def test_cached_sessions_need_shared_cache(self):
+        """Сессии в кэше процесса - предупреждение при запуске."""
+        self.assertEqual(check_session_cache(None), [])
+        engine = 'django.contrib.sessions.backends.cached_db'
+        with self.settings(SESSION_ENGINE=engine):
+            warnings = check_session_cache(None)
+            self.assertEqual([warning.id for warning in warnings],
+                             ['users.W001'])
+            self.assertIsInstance(warnings[0], Warning)
+            with self.settings(CACHES=SHARED_CACHES):
+                self.assertEqual(check_session_cache(None), [])
@@ -0,0 +1,12 @@
+"""What the apps need to know about the configured caches."""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared(alias='default'):
+    """Whether every server process sees the same cache ``alias``, i.e.
+    it is not a per-process ``LocMemCache``."""
+    backend = caches[alias]
+    # CountingCache (yatube.metrics) передаёт запросы настоящему бэкенду
+    backend = getattr(backend, 'counted', backend)
+    return not isinstance(backend, LocMemCache)
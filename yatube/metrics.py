@@ -0,0 +1,361 @@
+"""Request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` records for every request, by the URL name of its
+view (``posts:index``, ``api:post``, ...): the status, the duration
+histogram, the number and the total time of SQL queries, the template
+render time and the cache hits and misses. Queries are timed with
+``connection.execute_wrapper``, templates by the ``TimedDjangoTemplates``
+backend and cache lookups by ``CountingCache``, which wraps any cache
+backend; all of them only add up numbers in the current request's
+``RequestStats``.
+
+Only requests served by the WSGI application (``yatube.wsgi`` sets
+``registry.enabled``) are recorded, not the test client of management
+commands. Each process keeps its totals in memory and dumps them to
+``METRICS_DIR/<pid>.json`` at most every ``METRICS_FLUSH_INTERVAL``
+seconds. ``/metrics`` sums the files of all processes, so any worker
+answers for the whole server. The totals are counters: clear
+``METRICS_DIR`` when the server is restarted, not while it runs.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import (DjangoTemplates, Template,
+                                             reraise)
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_safe
+
+UNRESOLVED = 'unresolved'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_local = threading.local()
+_missing = object()
+
+
+class RequestStats:
+    """What the current request has spent so far."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper всех соединений
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - start
+
+
+def current_stats():
+    return getattr(_local, 'stats', None)
+
+
+def _new_view():
+    return {
+        'status': {},
+        'buckets': [0] * (len(settings.METRICS_BUCKETS) + 1),
+        'duration': 0.0,
+        'queries': 0,
+        'query_seconds': 0.0,
+        'template_seconds': 0.0,
+        'cache_hits': 0,
+        'cache_misses': 0,
+    }
+
+
+def _merge(total, part):
+    """Add the numbers of ``part`` to ``total`` (same shape, in place)."""
+    for key, value in part.items():
+        if isinstance(value, dict):
+            _merge(total.setdefault(key, {}), value)
+        elif isinstance(value, list):
+            found = total.setdefault(key, [0] * len(value))
+            for i, number in enumerate(value):
+                found[i] += number
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+class Registry:
+    """Totals of this process by view name."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.flushed_at = time.monotonic()
+        self.enabled = False
+
+    def record(self, view, status, duration, stats):
+        buckets = settings.METRICS_BUCKETS
+        with self.lock:
+            totals = self.views.get(view)
+            if totals is None:
+                totals = self.views[view] = _new_view()
+            status = str(status)
+            totals['status'][status] = totals['status'].get(status, 0) + 1
+            index = next((i for i, bound in enumerate(buckets)
+                          if duration <= bound), len(buckets))
+            totals['buckets'][index] += 1
+            totals['duration'] += duration
+            totals['queries'] += stats.queries
+            totals['query_seconds'] += stats.query_seconds
+            totals['template_seconds'] += stats.template_seconds
+            totals['cache_hits'] += stats.cache_hits
+            totals['cache_misses'] += stats.cache_misses
+        if time.monotonic() - self.flushed_at >= (
+                settings.METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """Write the totals to ``METRICS_DIR/<pid>.json``, if there are
+        any."""
+        self.flushed_at = time.monotonic()
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        with self.lock:
+            if not self.views:
+                # Процесс без запросов (команда, тесты) файла не оставляет
+                return
+            content = json.dumps(self.views)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, '%d.json' % os.getpid())
+        # Читатель не должен увидеть файл записанным наполовину
+        with open(path + '.tmp', 'w') as file:
+            file.write(content)
+        os.replace(path + '.tmp', path)
+
+    def collect(self):
+        """Totals of all processes that write to ``METRICS_DIR``."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            with self.lock:
+                return _merge({}, self.views)
+        self.flush()
+        views = {}
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            try:
+                with open(path) as file:
+                    _merge(views, json.load(file))
+            except (OSError, ValueError):
+                continue
+        return views
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+class _ClosingContent:
+    """Streaming content that calls ``finish`` once the response is
+    closed, whether or not it was read to the end."""
+
+    def __init__(self, content, finish):
+        self.content = content
+        self.finish = finish
+
+    def __iter__(self):
+        return iter(self.content)
+
+    def close(self):
+        finish, self.finish = self.finish, None
+        if finish is not None:
+            finish()
+
+
+class MetricsMiddleware:
+    """Records the metrics of every request; must be the first middleware
+    so that the duration covers all the others."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not registry.enabled:
+            return self.get_response(request)
+        start = time.perf_counter()
+        stats = _local.stats = RequestStats()
+        hooks = ExitStack()
+        for connection in connections.all():
+            hooks.enter_context(connection.execute_wrapper(stats))
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.finish(request, 500, start, stats, hooks)
+            raise
+        if response.streaming:
+            # Потоковый ответ дочитывает ленту уже после возврата из view:
+            # запрос учитывается, когда сервер закроет ответ
+            response.streaming_content = _ClosingContent(
+                response.streaming_content,
+                partial(self.finish, request, response.status_code, start,
+                        stats, hooks))
+        else:
+            self.finish(request, response.status_code, start, stats, hooks)
+        return response
+
+    def finish(self, request, status, start, stats, hooks):
+        hooks.close()
+        _local.stats = None
+        match = request.resolver_match
+        view = match.view_name if match is not None else UNRESOLVED
+        registry.record(view, status, time.perf_counter() - start, stats)
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        stats = current_stats()
+        if stats is None:
+            return super().render(context, request)
+        # Вложенные render_to_string (карточки постов) уже входят
+        # во время внешнего шаблона
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """``DjangoTemplates`` whose templates add their render time to the
+    current request's metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name),
+                                 self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class CountingCache:
+    """Cache backend that counts the hits and misses of the current
+    request and hands every call to the backend ``COUNTED_BACKEND``
+    configured next to it::
+
+        'default': {
+            'BACKEND': 'yatube.metrics.CountingCache',
+            'COUNTED_BACKEND': 'django.core.cache.backends.memcached.'
+                               'MemcachedCache',
+            'LOCATION': '127.0.0.1:11211',
+        }
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        backend = import_string(params.pop('COUNTED_BACKEND'))
+        self.counted = backend(location, params)
+
+    def __getattr__(self, name):
+        return getattr(self.counted, name)
+
+    def __contains__(self, key):
+        return key in self.counted
+
+    def get(self, key, default=None, version=None):
+        value = self.counted.get(key, _missing, version)
+        stats = current_stats()
+        if stats is not None:
+            if value is _missing:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.counted.get_many(keys, version)
+        stats = current_stats()
+        if stats is not None:
+            stats.cache_hits += len(found)
+            stats.cache_misses += len(keys) - len(found)
+        return found
+
+
+def _labels(**labels):
+    return ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', r'\\')
+                     .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items())
+
+
+def _counter(lines, name, help_text, views, key):
+    lines.append('# HELP %s %s' % (name, help_text))
+    lines.append('# TYPE %s counter' % name)
+    for view, totals in views:
+        lines.append('%s{%s} %s' % (name, _labels(view=view), totals[key]))
+
+
+def exposition(views):
+    """``views`` totals in the Prometheus text format."""
+    views = sorted(views.items())
+    lines = [
+        '# HELP yatube_requests_total Requests by view and status.',
+        '# TYPE yatube_requests_total counter',
+    ]
+    for view, totals in views:
+        for status, count in sorted(totals['status'].items()):
+            lines.append('yatube_requests_total{%s} %d'
+                         % (_labels(view=view, status=status), count))
+
+    name = 'yatube_request_duration_seconds'
+    lines.append('# HELP %s Request duration by view.' % name)
+    lines.append('# TYPE %s histogram' % name)
+    bounds = [repr(float(bound)) for bound in settings.METRICS_BUCKETS]
+    for view, totals in views:
+        cumulative = 0
+        for bound, count in zip(bounds + ['+Inf'], totals['buckets']):
+            cumulative += count
+            lines.append('%s_bucket{%s} %d'
+                         % (name, _labels(view=view, le=bound), cumulative))
+        lines.append('%s_sum{%s} %s'
+                     % (name, _labels(view=view), totals['duration']))
+        lines.append('%s_count{%s} %d'
+                     % (name, _labels(view=view), cumulative))
+
+    _counter(lines, 'yatube_db_queries_total',
+             'SQL queries by view.', views, 'queries')
+    _counter(lines, 'yatube_db_query_seconds_total',
+             'Time spent in SQL queries by view.', views, 'query_seconds')
+    _counter(lines, 'yatube_template_render_seconds_total',
+             'Time spent rendering templates by view.', views,
+             'template_seconds')
+    _counter(lines, 'yatube_cache_hits_total',
+             'Cache hits by view.', views, 'cache_hits')
+    _counter(lines, 'yatube_cache_misses_total',
+             'Cache misses by view.', views, 'cache_misses')
+    return '\n'.join(lines) + '\n'
+
+
+@require_safe
+def metrics(request):
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(exposition(registry.collect()),
+                        content_type=CONTENT_TYPE)
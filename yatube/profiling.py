@@ -0,0 +1,94 @@
+"""Sampling profiler for production requests.
+
+``ProfilingMiddleware`` runs ``cProfile`` on a random
+``PROFILING_SAMPLE_RATE`` share of the requests, optionally only for the
+URL names in ``PROFILING_VIEWS``, and keeps the profile only if the
+request took at least ``PROFILING_MIN_DURATION`` seconds. Profiles are
+written to ``PROFILING_DIR`` as ``<time>-<pid>-<view>.prof``; the oldest
+are deleted so that at most ``PROFILING_MAX_FILES`` are kept.
+``manage.py profile_report`` merges them by view.
+
+The profile ends when the view returns, so the rest of a streamed
+response is not included.
+"""
+import cProfile
+import logging
+import os
+import random
+import time
+
+from django.conf import settings
+from django.urls import Resolver404, get_resolver
+
+UNRESOLVED = 'unresolved'
+SUFFIX = '.prof'
+
+logger = logging.getLogger(__name__)
+
+
+def view_name(request):
+    try:
+        match = get_resolver(getattr(request, 'urlconf', None)).resolve(
+            request.path_info)
+    except Resolver404:
+        return UNRESOLVED
+    return match.view_name
+
+
+def profile_files(directory=None):
+    """``(view name, path)`` of the saved profiles, oldest first."""
+    directory = directory or settings.PROFILING_DIR
+    try:
+        names = sorted(name for name in os.listdir(directory)
+                       if name.endswith(SUFFIX))
+    except FileNotFoundError:
+        return []
+    return [(name[:-len(SUFFIX)].split('-', 2)[2],
+             os.path.join(directory, name)) for name in names]
+
+
+def save(profiler, view):
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    # Имя начинается со времени, поэтому сортировка по имени - по возрасту
+    name = '%020d-%d-%s%s' % (time.time_ns(), os.getpid(), view, SUFFIX)
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+    files = profile_files(directory)
+    for _, old in files[:-settings.PROFILING_MAX_FILES]:
+        try:
+            os.remove(old)
+        except FileNotFoundError:
+            # его уже удалил другой процесс
+            pass
+
+
+class ProfilingMiddleware:
+    """Profiles a sample of the requests with ``cProfile``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        view = view_name(request)
+        views = settings.PROFILING_VIEWS
+        if views is not None and view not in views:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler.disable()
+            if time.perf_counter() - start >= (
+                    settings.PROFILING_MIN_DURATION):
+                try:
+                    save(profiler, view)
+                except OSError:
+                    logger.exception('Cannot save the profile of %s', view)
@@ -0,0 +1,211 @@
+"""Media and static file serving for production.
+
+``django.views.static.serve`` is meant for development: it reads files
+in Python and supports neither byte ranges nor ETags. ``serve_media``
+only checks the path and ``stat``-s the file. Depending on
+``MEDIA_SENDFILE`` it then either hands the file to the front proxy
+(``X-Accel-Redirect`` for nginx, ``X-Sendfile`` for Apache/lighttpd) or
+returns a ``FileResponse``, which WSGI servers send with ``sendfile()``.
+Both paths answer ``If-None-Match``/``If-Modified-Since`` with 304 from
+the ``stat`` result alone. Byte ranges are served by the proxy or, in
+the fallback, by ``serve_media`` itself.
+
+``serve_static`` serves ``collectstatic`` output the same way, picking
+the precompressed sibling that the client accepts.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from .staticfiles import compressed_path
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 2 ** 10
+# Имена, которые строят из хэша ContentAddressedStorage
+# (posts/ab/<sha256>.jpg) и sorl-thumbnail (cache/ab/cd/<md5>.jpg)
+HASHED_MEDIA_RE = re.compile(
+    r'^(?:[\w/]+/[0-9a-f]{2}/[0-9a-f]{64}'
+    r'|%s[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32})\.\w+$'
+    % re.escape(sorl_settings.THUMBNAIL_PREFIX))
+
+
+def media_etag(stat_result):
+    """Strong ETag from the file's size and modification time."""
+    return quote_etag('%x-%x' % (stat_result.st_size,
+                                 stat_result.st_mtime_ns))
+
+
+def parse_range(header, size):
+    """``(start, end)`` (inclusive) for a single-range ``Range`` header.
+
+    Return ``None`` if the header should be ignored (missing, malformed or
+    asking for several ranges) and raise ``ValueError`` if the range cannot
+    be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: последние N байт
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _sendfile_response(path, full_path, content_type):
+    # Диапазоны и сам файл отдаёт прокси
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = (settings.MEDIA_ACCEL_PREFIX
+                                        + quote(path))
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def _file_response(request, full_path, stat_result, content_type):
+    size = stat_result.st_size
+    byte_range = None
+    if request.method == 'GET':
+        if_range = request.META.get('HTTP_IF_RANGE')
+        # Диапазон отдаём, только если файл не изменился с прошлого раза
+        if not if_range or if_range == media_etag(stat_result):
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'),
+                                         size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = 'bytes */%d' % size
+                return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+    elif byte_range is None:
+        response = FileResponse(open(full_path, 'rb'),
+                                content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, end - start + 1),
+            status=206, content_type=content_type)
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _stat_file(root, path):
+    """Normalized ``path``, its full path under ``root`` and ``os.stat``
+    result; ``Http404`` unless it is a regular, non-hidden file."""
+    path = posixpath.normpath(path).lstrip('/')
+    # Скрытые файлы (.htaccess и т.п.) не отдаём
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        full_path = safe_join(root, path)
+        stat_result = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404
+    return path, full_path, stat_result
+
+
+def _serve(request, full_path, stat_result, content_type, cache_control,
+           sendfile_path=None):
+    etag = media_etag(stat_result)
+    last_modified = int(stat_result.st_mtime)
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response is None:
+        if sendfile_path is not None:
+            response = _sendfile_response(sendfile_path, full_path,
+                                          content_type)
+        else:
+            response = _file_response(request, full_path, stat_result,
+                                      content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def _content_type(path):
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve the file ``path`` from ``MEDIA_ROOT``.
+
+    Only files named after their content hash are cached as immutable:
+    a file uploaded before the names were hashed may be replaced in place.
+    """
+    path, full_path, stat_result = _stat_file(settings.MEDIA_ROOT, path)
+    if HASHED_MEDIA_RE.match(path):
+        cache_control = settings.MEDIA_CACHE_CONTROL
+    else:
+        cache_control = settings.MEDIA_MUTABLE_CACHE_CONTROL
+    return _serve(request, full_path, stat_result, _content_type(path),
+                  cache_control,
+                  sendfile_path=path if settings.MEDIA_SENDFILE else None)
+
+
+@require_safe
+def serve_static(request, path):
+    """Serve the collected file ``path`` from ``STATIC_ROOT``.
+
+    Clients that accept brotli or gzip get the precompressed sibling
+    written by ``collectstatic``. Files with a content hash in their name
+    are cached forever, the rest are revalidated.
+    """
+    path, full_path, stat_result = _stat_file(settings.STATIC_ROOT, path)
+    sent_path, encoding = compressed_path(
+        full_path, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is not None:
+        stat_result = os.stat(sent_path)
+    if path in staticfiles_storage.hashed_names:
+        cache_control = settings.STATIC_CACHE_CONTROL
+    else:
+        cache_control = 'no-cache'
+    response = _serve(request, sent_path, stat_result, _content_type(path),
+                      cache_control)
+    if encoding is not None:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
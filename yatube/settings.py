@@ -37,9 +37,10 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    'users',
-    'posts',
+    'users.apps.UsersConfig',
+    'posts.apps.PostsConfig',
     'about',
+    'api',
     "debug_toolbar",
     'sorl.thumbnail',
     'django.contrib.admin',
@@ -51,11 +52,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # первым, чтобы время запроса включало все остальные middleware
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # request.user из кэша (users/middleware.py)
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -66,7 +71,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, замеряющий время отрисовки для /metrics
+        'BACKEND': 'yatube.metrics.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -135,10 +141,24 @@ STATIC_URL = '/static/'
 # задаём адрес директории, куда командой *collectstatic* будет собрана вся
 # статика
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
+# collectstatic добавляет хэш содержимого к именам файлов и сжимает их
+STATICFILES_STORAGE = 'yatube.staticfiles.CompressedManifestStaticFilesStorage'
+# Файлы с хэшем в имени никогда не меняются
+STATIC_CACHE_CONTROL = 'public, max-age=31536000, immutable'
 
 # Path for images and other media
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Кто отдаёт медиафайлы: None - Django (FileResponse), 'x-accel-redirect' -
+# nginx (internal location MEDIA_ACCEL_PREFIX смотрит в MEDIA_ROOT),
+# 'x-sendfile' - Apache или lighttpd
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Имена картинок постов и миниатюр - хэши, они меняются вместе с
+# содержимым, поэтому кэшировать их можно вечно
+MEDIA_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Остальные файлы (загруженные до хэширования имён) перепроверяются по ETag
+MEDIA_MUTABLE_CACHE_CONTROL = 'no-cache'
 
 # Login
 
@@ -154,10 +174,109 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # Считает попадания и промахи для /metrics и передаёт запросы
+        # настоящему бэкенду COUNTED_BACKEND
+        'BACKEND': 'yatube.metrics.CountingCache',
+        'COUNTED_BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Лента подписок: записи авторов, у которых подписчиков больше
+# FEED_FANOUT_MAX_FOLLOWERS, не раскладываются по лентам, а подмешиваются при
+# чтении
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+# Сколько последних записей автора попадает в ленту при подписке
+FEED_BACKFILL_LIMIT = 1000
+# Сколько первых страниц ленты подписок кэшируется для каждого читателя
+FOLLOW_FEED_CACHE_PAGES = 3
+FOLLOW_FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько секунд паджинатор ленты доверяет закэшированному числу записей
+FEED_COUNT_CACHE_TIMEOUT = 60
+# Дальше этой страницы ленты листаются только курсором (?cursor=): ?page=N
+# с большим номером открывает её, а не пропускает N страниц через OFFSET
+FEED_MAX_PAGE = 100
+# Отрисованные карточки постов; ключ меняется вместе с Post.updated_at
+POST_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Фрагмент ленты feed_page живёт до смены поколения (posts/cache.py). С
+# кэшем в памяти процесса поколения других процессов сюда не доходят, и
+# всё, что ключом от них зависит, хранится не дольше
+# LOCAL_GENERATION_TIMEOUT секунд
+FEED_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+LOCAL_GENERATION_TIMEOUT = 20
+# Потоковая отдача лент (posts/streaming.py): шапка страницы уходит сразу,
+# карточки - пачками по STREAMING_FEED_CHUNK. Такая страница не попадает
+# в кэш фрагмента feed_page и отдаётся без Content-Length
+STREAMING_FEEDS = False
+STREAMING_FEED_CHUNK = 5
+# Загрузки всегда пишутся во временный файл и не больше UPLOAD_MAX_BYTES
+FILE_UPLOAD_HANDLERS = ['posts.uploads.LimitedUploadHandler']
+UPLOAD_MAX_BYTES = 20 * 2 ** 20
+# Картинки перекодируются в отдельных процессах (см. posts/images.py)
+IMAGE_WORKERS = 2
+IMAGE_MAX_PIXELS = 50 * 10 ** 6
+IMAGE_MAX_SIDE = 2048
+IMAGE_QUALITY = 85
+IMAGE_PROCESS_TIMEOUT = 30
+# Входит в ETag страниц: увеличьте, если изменились шаблоны, иначе
+# браузеры продолжат показывать старую разметку из своего кэша
+PAGE_ETAG_VERSION = '1'
+# JSON API: размер страницы по умолчанию и наибольший (?limit=)
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 50
+# /metrics: каждый процесс раз в METRICS_FLUSH_INTERVAL секунд пишет свои
+# счётчики в METRICS_DIR/<pid>.json, а /metrics складывает все файлы.
+# Каталог очищают при перезапуске сервера
+METRICS_DIR = os.path.join(BASE_DIR, 'var', 'metrics')
+METRICS_FLUSH_INTERVAL = 10
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Кому отдаётся /metrics; None - всем
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+# Поиск (posts/search.py): сколько самых новых совпадений ранжируется,
+# сколько лучших из них выводится, и насколько поднимаются свежие записи -
+# запись возрастом SEARCH_RECENCY_DAYS получает половину надбавки
+# SEARCH_RECENCY_WEIGHT
+SEARCH_MAX_CANDIDATES = 5000
+SEARCH_MAX_RESULTS = 1000
+SEARCH_RECENCY_WEIGHT = 1.0
+SEARCH_RECENCY_DAYS = 30
+# Сколько строк массовые действия админки меняют одной транзакцией
+ADMIN_BATCH_SIZE = 500
+# Сессии читаются через кэш (cached_db), только если кэш общий для всех
+# процессов: с LocMemCache у каждого процесса была бы своя копия сессии
+# (проверка users.W001). Движок следует за CACHES - отдельно его не меняйте
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.db'
+    if CACHES['default'].get('COUNTED_BACKEND', CACHES['default']['BACKEND'])
+    == 'django.core.cache.backends.locmem.LocMemCache'
+    else 'django.contrib.sessions.backends.cached_db'
+)
+# Сколько секунд CachedAuthenticationMiddleware хранит пользователя в
+# общем кэше; с LocMemCache пользователь читается из БД
+USER_CACHE_TIMEOUT = 60 * 60
+# Ограничение частоты записей (posts/ratelimit.py): ведро токенов на
+# пользователя и на IP для каждого имени URL. '10/m' - не больше 10
+# запросов подряд, дальше по 10 в минуту
+RATELIMITS = {
+    'posts:new_post': {'user': '10/h', 'ip': '30/h'},
+    'posts:post_edit': {'user': '30/h', 'ip': '60/h'},
+    'posts:add_comment': {'user': '10/m', 'ip': '30/m'},
+    'posts:profile_follow': {'user': '30/m', 'ip': '60/m'},
+    'posts:profile_unfollow': {'user': '30/m', 'ip': '60/m'},
+}
+# Ключ request.META с адресом клиента; за nginx - например HTTP_X_REAL_IP
+RATELIMIT_IP_HEADER = 'REMOTE_ADDR'
+# Профилирование (yatube/profiling.py): доля запросов под cProfile,
+# только эти имена URL (None - все) и только запросы не быстрее
+# PROFILING_MIN_DURATION секунд. Хранятся последние PROFILING_MAX_FILES
+# профилей, сводку выводит manage.py profile_report
+PROFILING_SAMPLE_RATE = 0
+PROFILING_VIEWS = None
+PROFILING_MIN_DURATION = 0
+PROFILING_DIR = os.path.join(BASE_DIR, 'var', 'profiles')
+PROFILING_MAX_FILES = 500
+# Потоки, в которых готовятся миниатюры только что загруженных картинок
+THUMBNAIL_WORKERS = 2
+
 # Добавьте IP адреса при обращении с которых будет доступен инструмент
 
 INTERNAL_IPS = [
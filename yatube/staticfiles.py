@@ -0,0 +1,94 @@
+"""``collectstatic`` storage with hashed names and precompressed files.
+
+``CompressedManifestStaticFilesStorage`` writes every file under a name
+that includes a hash of its content (``bootstrap.min.3a5f0c1d2e4b.css``)
+plus ``staticfiles.json``, so ``{% static %}`` URLs change whenever the
+file does and can be cached as immutable. Text files then get ``.gz``
+siblings, and ``.br`` ones if the ``brotli`` package is installed.
+``yatube.serving.serve_static`` sends those siblings to clients that
+accept them.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils.functional import cached_property
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Форматы, которые имеет смысл сжимать; картинки и шрифты уже сжаты
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.txt', '.html',
+                           '.json', '.xml', '.ico', '.eot', '.ttf')
+# Мелкие файлы сжатие почти не уменьшает
+MIN_COMPRESS_SIZE = 256
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic ещё не запускали (разработка, тесты)
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        """Write the compressed siblings of ``name`` worth keeping and
+        return their names."""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return []
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return []
+        written = []
+        for suffix, compress in _compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(compressed))
+            written.append(compressed_name)
+        return written
+
+    @cached_property
+    def hashed_names(self):
+        """Names of the files that are safe to cache forever."""
+        return frozenset(self.hashed_files.values())
+
+
+def compressed_path(path, accept_encoding):
+    """The precompressed sibling of ``path`` to send for a request with
+    ``accept_encoding`` as ``(path, encoding)``, or ``(path, None)``."""
+    accepted = set()
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.partition(';')
+        # "gzip;q=0" означает, что gzip клиент не принимает
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00',
+                                           'q=0.000'):
+            accepted.add(coding.strip())
+    for suffix, encoding in (('.br', 'br'), ('.gz', 'gzip')):
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
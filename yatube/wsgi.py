@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# /metrics учитывает только запросы, пришедшие через это приложение
+from yatube.metrics import registry  # noqa: E402
+
+registry.enabled = True